@@ -0,0 +1,108 @@
+import asyncio
+import os
+import psycopg
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+from app.database import (DATABASE_URL, CURRENT_WAL_LSN_QUERY, get_sql, choose_connection_string, is_select,
+                          replica_enabled, replication_monitor)
+from app.consistency import record_write_lsn, is_tracking
+
+ASYNC_DB_POOL_MIN_SIZE = int(os.getenv("ASYNC_DB_POOL_MIN_SIZE", "1"))
+ASYNC_DB_POOL_MAX_SIZE = int(os.getenv("ASYNC_DB_POOL_MAX_SIZE", "10"))
+ASYNC_DB_POOL_TIMEOUT = float(os.getenv("ASYNC_DB_POOL_TIMEOUT", "10"))
+
+_async_pools = {}
+_async_pools_lock = None
+
+
+def _get_lock():
+    # Блокировка создаётся внутри работающего event loop (в Python 3.9 asyncio.Lock привязывается к loop при создании)
+    global _async_pools_lock
+    if _async_pools_lock is None:
+        _async_pools_lock = asyncio.Lock()
+    return _async_pools_lock
+
+
+async def get_async_pool(dsn):
+    """Асинхронный пул соединений для строки подключения (открывается при первом обращении)"""
+    pool = _async_pools.get(dsn)
+    if pool is None:
+        async with _get_lock():
+            pool = _async_pools.get(dsn)
+            if pool is None:
+                pool = AsyncConnectionPool(
+                    dsn,
+                    min_size=ASYNC_DB_POOL_MIN_SIZE,
+                    max_size=ASYNC_DB_POOL_MAX_SIZE,
+                    timeout=ASYNC_DB_POOL_TIMEOUT,
+                    kwargs={"row_factory": dict_row},
+                    check=AsyncConnectionPool.check_connection,
+                    open=False
+                )
+                await pool.open()
+                _async_pools[dsn] = pool
+    return pool
+
+
+async def close_async_pools():
+    """Закрытие асинхронных пулов (при остановке приложения)"""
+    async with _get_lock():
+        for pool in _async_pools.values():
+            await pool.close()
+        _async_pools.clear()
+
+
+def get_async_pool_stats():
+    """Метрики асинхронных пулов (см. psycopg_pool.AsyncConnectionPool.get_stats)"""
+    return {"master" if dsn == DATABASE_URL else "replica": pool.get_stats() for dsn, pool in _async_pools.items()}
+
+
+async def execute_sql_file_async(file_path, params=None, read_only=False):
+    """
+    Асинхронное выполнение SQL-файла, не блокирующее event loop
+
+    Args:
+        file_path: путь к SQL-файлу относительно app/sql
+        params: параметры для SQL-запроса
+        read_only: если True, запрос выполняется на реплике (только для SELECT)
+    """
+    sql = get_sql(file_path)
+
+    # Без дозапроса LSN реплики: синхронный запрос заблокировал бы event loop
+    connection_string = choose_connection_string(sql, read_only, refresh_replica_lsn=False)
+
+    if connection_string != DATABASE_URL:
+        try:
+            result = await _execute_async(connection_string, sql, params)
+            replication_monitor.record_read(on_replica=True)
+            return result
+        except (psycopg.OperationalError, PoolTimeout) as error:
+            replication_monitor.mark_unavailable(str(error))
+
+    if read_only and replica_enabled():
+        replication_monitor.record_read(on_replica=False)
+
+    result = await _execute_async(DATABASE_URL, sql, params)
+
+    if not is_select(sql) and replica_enabled() and is_tracking():
+        try:
+            rows = await _execute_async(DATABASE_URL, CURRENT_WAL_LSN_QUERY, None)
+            record_write_lsn(rows[0]["lsn"])
+        except Exception as error:
+            print(f"Error capturing WAL LSN: {error}")
+
+    return result
+
+
+async def _execute_async(connection_string, sql, params):
+    pool = await get_async_pool(connection_string)
+    try:
+        async with pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql, params or {})
+                if cursor.description is None:
+                    return None
+                return await cursor.fetchall()
+    except Exception as error:
+        print(f"Error executing SQL: {error}")
+        raise
@@ -0,0 +1,51 @@
+from contextvars import ContextVar
+from app.replication import parse_lsn
+
+CONSISTENCY_HEADER = "X-Consistency-Token"
+
+_request_state = ContextVar("consistency_state", default=None)
+
+
+def begin_request(token=None):
+    """
+    Состояние согласованности текущего запроса: минимальный LSN, который должна
+    проиграть реплика (из токена клиента), и LSN мастера после записей запроса
+    """
+    min_lsn = None
+    if token:
+        try:
+            min_lsn = parse_lsn(token)
+        except ValueError:
+            min_lsn = None
+
+    state = {"min_lsn": min_lsn, "write_lsn": None}
+    _request_state.set(state)
+    return state
+
+
+def required_lsn():
+    """LSN, начиная с которого реплика может обслужить чтение текущего запроса"""
+    state = _request_state.get()
+    if state is None:
+        return None
+    return max(filter(None, (state["min_lsn"], state["write_lsn"])), default=None)
+
+
+def is_tracking():
+    return _request_state.get() is not None
+
+
+def record_write_lsn(lsn):
+    state = _request_state.get()
+    if state is not None:
+        state["write_lsn"] = max(state["write_lsn"] or 0, parse_lsn(lsn))
+
+
+def format_lsn(lsn):
+    return f"{lsn >> 32:X}/{lsn & 0xFFFFFFFF:X}"
+
+
+def response_token(state):
+    """Токен для ответа: наибольший из LSN клиента и LSN записей запроса"""
+    lsn = max(filter(None, (state["min_lsn"], state["write_lsn"])), default=None)
+    return format_lsn(lsn) if lsn is not None else None
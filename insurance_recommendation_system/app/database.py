@@ -5,7 +5,10 @@ import os
 from dotenv import load_dotenv
 import psycopg2
 import pathlib
-from psycopg2.extras import RealDictCursor
+import threading
+from app.db_pool import ConnectionPool, PoolTimeoutError
+from app.replication import ReplicationMonitor
+from app.consistency import required_lsn, record_write_lsn, is_tracking
 
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -18,6 +21,17 @@ Base = declarative_base()
 slave_engine = create_engine(DATABASE_SLAVE_URL)
 SlaveSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=slave_engine)
 
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_HEALTHCHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTHCHECK_INTERVAL", "30"))
+REPLICA_MAX_LAG_BYTES = int(os.getenv("REPLICA_MAX_LAG_BYTES", str(1024 * 1024)))
+REPLICATION_LAG_POLL_INTERVAL = float(os.getenv("REPLICATION_LAG_POLL_INTERVAL", "5"))
+
+SQL_DIR = pathlib.Path(__file__).parent.absolute() / "sql"
+
+_pools = {}
+_pools_lock = threading.Lock()
+
 
 def get_db():
     """Получение сессии с мастер-базой (для чтения и записи)"""
@@ -37,6 +51,136 @@ def get_slave_db():
         db.close()
 
 
+def load_sql_registry():
+    """Чтение всех SQL-файлов каталога app/sql в память (один раз при старте)"""
+    registry = {}
+    for path in SQL_DIR.rglob("*.sql"):
+        registry[path.relative_to(SQL_DIR).as_posix()] = path.read_text()
+    return registry
+
+
+def get_sql(file_path):
+    """Текст SQL-запроса из реестра; файлы, появившиеся после старта, читаются с диска один раз"""
+    sql = _sql_registry.get(file_path)
+    if sql is None:
+        with open(SQL_DIR / file_path, 'r') as f:
+            sql = f.read()
+        _sql_registry[file_path] = sql
+    return sql
+
+
+def get_pool(dsn):
+    """Пул соединений для строки подключения (создаётся при первом обращении)"""
+    pool = _pools.get(dsn)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(dsn)
+            if pool is None:
+                pool = ConnectionPool(dsn, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT, DB_POOL_HEALTHCHECK_INTERVAL)
+                _pools[dsn] = pool
+    return pool
+
+
+def close_pools():
+    """Закрытие всех соединений пулов (при остановке приложения)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+def get_pool_stats():
+    """Метрики пулов соединений: число выдач, время ожидания, занятые соединения"""
+    return {"master" if dsn == DATABASE_URL else "replica": pool.stats() for dsn, pool in _pools.items()}
+
+
+def replica_enabled():
+    """Реплика настроена отдельно от мастера"""
+    return bool(DATABASE_SLAVE_URL) and DATABASE_SLAVE_URL != DATABASE_URL
+
+
+CURRENT_WAL_LSN_QUERY = "SELECT pg_current_wal_lsn() AS lsn"
+
+
+def _fetch_lsn(dsn, query):
+    with get_pool(dsn).connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query)
+            row = cursor.fetchone()
+        conn.rollback()
+    return row["lsn"]
+
+
+replication_monitor = ReplicationMonitor(
+    lambda: _fetch_lsn(DATABASE_URL, CURRENT_WAL_LSN_QUERY),
+    lambda: _fetch_lsn(DATABASE_SLAVE_URL, "SELECT pg_last_wal_replay_lsn() AS lsn"),
+    REPLICA_MAX_LAG_BYTES,
+    REPLICATION_LAG_POLL_INTERVAL
+)
+
+
+def start_replication_monitor():
+    """Запуск фонового замера отставания реплики (если реплика настроена)"""
+    if replica_enabled():
+        replication_monitor.start()
+
+
+def stop_replication_monitor():
+    replication_monitor.stop()
+
+
+def is_select(sql):
+    return sql.strip().lower().startswith('select')
+
+
+def choose_connection_string(sql, read_only, refresh_replica_lsn=True):
+    """
+    SELECT с read_only=True направляется на реплику, если её отставание в пределах
+    REPLICA_MAX_LAG_BYTES и она уже проиграла LSN из токена согласованности запроса;
+    всё остальное выполняется на мастере
+    """
+    if not (is_select(sql) and read_only and replica_enabled() and replication_monitor.replica_available()):
+        return DATABASE_URL
+
+    lsn = required_lsn()
+    if lsn is not None and not replication_monitor.replica_caught_up(lsn, refresh=refresh_replica_lsn):
+        replication_monitor.record_consistency_fallback()
+        return DATABASE_URL
+
+    return DATABASE_SLAVE_URL
+
+
+def capture_write_lsn():
+    """Запоминает LSN мастера после записи, чтобы вернуть его клиенту как токен согласованности"""
+    try:
+        record_write_lsn(_fetch_lsn(DATABASE_URL, CURRENT_WAL_LSN_QUERY))
+    except Exception as error:
+        print(f"Error capturing WAL LSN: {error}")
+
+
+def _execute(connection_string, sql, params):
+    with get_pool(connection_string).connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params or {})
+
+            try:
+                result = cursor.fetchall()
+                conn.commit()
+                return result
+            except psycopg2.ProgrammingError:
+                conn.commit()
+                return None
+
+        except Exception as error:
+            print(f"Error executing SQL: {error}")
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+
 def execute_sql_file(file_path, params=None, read_only=False):
     """
     Выполнение SQL-файла
@@ -46,37 +190,28 @@ def execute_sql_file(file_path, params=None, read_only=False):
         params: параметры для SQL-запроса
         read_only: если True, запрос выполняется на реплике (только для SELECT)
     """
-    base_path = pathlib.Path(__file__).parent.absolute()
-    full_path = base_path / "sql" / file_path
+    sql = get_sql(file_path)
 
-    with open(full_path, 'r') as f:
-        sql = f.read()
+    connection_string = choose_connection_string(sql, read_only)
 
-    is_select_query = sql.strip().lower().startswith('select')
+    if connection_string != DATABASE_URL:
+        try:
+            result = _execute(connection_string, sql, params)
+            replication_monitor.record_read(on_replica=True)
+            return result
+        except (psycopg2.OperationalError, psycopg2.InterfaceError, PoolTimeoutError) as error:
+            # Реплика недоступна: читаем с мастера до следующего успешного замера отставания
+            replication_monitor.mark_unavailable(str(error))
 
-    # connection_string = DATABASE_SLAVE_URL if is_select_query and read_only else DATABASE_URL
-    connection_string = DATABASE_URL
+    if read_only and replica_enabled():
+        replication_monitor.record_read(on_replica=False)
 
-    conn = None
-    try:
-        conn = psycopg2.connect(connection_string, cursor_factory=RealDictCursor)
-        cursor = conn.cursor()
-        cursor.execute(sql, params or {})
+    result = _execute(DATABASE_URL, sql, params)
 
-        try:
-            result = cursor.fetchall()
-            conn.commit()
-            return result
-        except psycopg2.ProgrammingError:
-            conn.commit()
-            return None
+    if not is_select(sql) and replica_enabled() and is_tracking():
+        capture_write_lsn()
 
-    except Exception as error:
-        print(f"Error executing SQL: {error}")
-        if conn:
-            conn.rollback()
-        raise
-    finally:
-        if conn:
-            cursor.close()
-            conn.close()
+    return result
+
+
+_sql_registry = load_sql_registry()
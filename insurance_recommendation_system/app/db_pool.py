@@ -0,0 +1,136 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+
+class PoolTimeoutError(Exception):
+    """Не удалось получить соединение из пула за отведённое время"""
+
+
+class ConnectionPool:
+    """
+    Пул соединений psycopg2 ограниченного размера.
+
+    Если все соединения заняты, поток ждёт освобождения не дольше timeout секунд.
+    Соединение, простаивавшее дольше healthcheck_interval, перед выдачей проверяется
+    запросом SELECT 1; закрытые и сломанные соединения отбрасываются.
+    """
+
+    def __init__(self, dsn, max_size=10, timeout=10.0, healthcheck_interval=30.0):
+        self.dsn = dsn
+        self.max_size = max_size
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+
+        self.checkouts = 0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.in_use = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, cursor_factory=RealDictCursor)
+        with self._lock:
+            self.created += 1
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self.discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.healthcheck_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _checkout(self):
+        while True:
+            try:
+                conn, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+
+            if self._is_healthy(conn, idle_since):
+                return conn
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """Выдаёт соединение из пула и возвращает его обратно после использования"""
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeoutError(f"Timed out after {self.timeout}s waiting for a database connection")
+
+        waited = time.perf_counter() - started
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        conn = None
+        broken = False
+        try:
+            conn = self._checkout()
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            if conn is not None:
+                if broken or conn.closed:
+                    self._discard(conn)
+                else:
+                    self._idle.put((conn, time.monotonic()))
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "in_use": self.in_use,
+                "idle": self._idle.qsize(),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "created": self.created,
+                "discarded": self.discarded,
+                "avg_wait_ms": self.total_wait_seconds / self.checkouts * 1000 if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+            }
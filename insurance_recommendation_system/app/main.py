@@ -1,8 +1,11 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, users, recommendations
+from app.routers import auth, users, recommendations, metrics
 from app.models import user_models, recommendation_models
-from app.database import engine
+from app.database import engine, close_pools, start_replication_monitor, stop_replication_monitor
+from app.async_database import close_async_pools
+from app.ml_client import start_ml_client, close_ml_client
+from app.consistency import CONSISTENCY_HEADER, begin_request, response_token
 
 user_models.Base.metadata.create_all(bind=engine)
 recommendation_models.Base.metadata.create_all(bind=engine)
@@ -19,11 +22,51 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[CONSISTENCY_HEADER],
 )
 
+
+@app.middleware("http")
+async def consistency_token_middleware(request: Request, call_next):
+    """
+    Read-your-writes: клиент возвращает полученный после записи токен (LSN мастера)
+    в заголовке X-Consistency-Token, и чтения идут на реплику только после того,
+    как она проиграла этот LSN
+    """
+    state = begin_request(request.headers.get(CONSISTENCY_HEADER))
+    response = await call_next(request)
+
+    token = response_token(state)
+    if token:
+        response.headers[CONSISTENCY_HEADER] = token
+    return response
+
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(recommendations.router)
+app.include_router(metrics.router)
+
+
+@app.on_event("startup")
+def startup_replication_monitor():
+    start_replication_monitor()
+
+
+@app.on_event("startup")
+def startup_ml_client():
+    start_ml_client()
+
+
+@app.on_event("shutdown")
+async def shutdown_database_pools():
+    stop_replication_monitor()
+    close_pools()
+    await close_async_pools()
+
+
+@app.on_event("shutdown")
+async def shutdown_ml_client():
+    await close_ml_client()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+from collections import deque
+
+import httpx
+
+ML_CLIENT_MAX_CONNECTIONS = int(os.getenv("ML_CLIENT_MAX_CONNECTIONS", "100"))
+ML_CLIENT_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("ML_CLIENT_MAX_KEEPALIVE_CONNECTIONS", "20"))
+ML_CLIENT_KEEPALIVE_EXPIRY = float(os.getenv("ML_CLIENT_KEEPALIVE_EXPIRY", "30"))
+ML_CLIENT_TIMEOUT = float(os.getenv("ML_CLIENT_TIMEOUT", "120"))
+ML_CLIENT_CONNECT_TIMEOUT = float(os.getenv("ML_CLIENT_CONNECT_TIMEOUT", "10"))
+ML_CLIENT_POOL_TIMEOUT = float(os.getenv("ML_CLIENT_POOL_TIMEOUT", "10"))
+ML_CLIENT_HTTP2 = os.getenv("ML_CLIENT_HTTP2", "false").lower() == "true"
+ML_CLIENT_LATENCY_WINDOW = int(os.getenv("ML_CLIENT_LATENCY_WINDOW", "1000"))
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class UpstreamMetrics:
+    """Задержка вызовов ML-сервиса (по последним window запросам) и занятость пула соединений"""
+
+    def __init__(self, max_connections, window=1000):
+        self.max_connections = max_connections
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.errors = 0
+        self.pool_timeouts = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def started(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finished(self, seconds, error=None):
+        with self._lock:
+            self.in_flight -= 1
+            self.latencies.append(seconds)
+            if error is not None:
+                self.errors += 1
+                if isinstance(error, httpx.PoolTimeout):
+                    self.pool_timeouts += 1
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            in_flight = self.in_flight
+            stats = {
+                "requests": self.requests,
+                "errors": self.errors,
+                "pool_timeouts": self.pool_timeouts,
+                "in_flight": in_flight,
+                "max_in_flight": self.max_in_flight,
+                "max_connections": self.max_connections,
+            }
+
+        def percentile(q):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+        stats["pool_saturation"] = in_flight / self.max_connections if self.max_connections else 0.0
+        stats["latency_ms"] = {
+            "avg": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+            "p50": percentile(0.50),
+            "p99": percentile(0.99),
+            "max": latencies[-1] * 1000 if latencies else 0.0,
+        }
+        return stats
+
+
+_client = None
+_http2 = False
+upstream_metrics = UpstreamMetrics(ML_CLIENT_MAX_CONNECTIONS, ML_CLIENT_LATENCY_WINDOW)
+
+
+def start_ml_client(transport=None):
+    """
+    Общий клиент для запросов к ML-сервису на всё время жизни приложения:
+    соединения переиспользуются (keep-alive) вместо установки нового на каждый запрос
+    """
+    global _client, _http2
+    if _client is not None:
+        return _client
+
+    _http2 = ML_CLIENT_HTTP2 and _http2_available()
+    if ML_CLIENT_HTTP2 and not _http2:
+        print("HTTP/2 requested for the recommendation client, but h2 is not installed; using HTTP/1.1")
+
+    _client = httpx.AsyncClient(
+        timeout=httpx.Timeout(ML_CLIENT_TIMEOUT, connect=ML_CLIENT_CONNECT_TIMEOUT, pool=ML_CLIENT_POOL_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=ML_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=ML_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=ML_CLIENT_KEEPALIVE_EXPIRY
+        ),
+        http2=_http2,
+        transport=transport
+    )
+    return _client
+
+
+def get_ml_client():
+    return _client if _client is not None else start_ml_client()
+
+
+async def close_ml_client():
+    """Закрытие клиента и его соединений (при остановке приложения)"""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+
+async def post_to_ml(url, payload):
+    """POST в ML-сервис через общий клиент с учётом задержки и занятости пула"""
+    client = get_ml_client()
+    upstream_metrics.started()
+    started = time.perf_counter()
+    error = None
+    try:
+        return await client.post(url, json=payload)
+    except Exception as exc:
+        error = exc
+        raise
+    finally:
+        upstream_metrics.finished(time.perf_counter() - started, error)
+
+
+class MLStream:
+    """
+    Потоковый ответ ML-сервиса: байты передаются дальше по мере поступления, без
+    буферизации. Запрос считается выполняющимся (in_flight), пока поток не закрыт;
+    задержкой считается время до заголовков ответа.
+    """
+
+    def __init__(self, response, started):
+        self.response = response
+        self.latency = time.perf_counter() - started
+        self._closed = False
+
+    @property
+    def media_type(self):
+        return self.response.headers.get("content-type", "application/x-ndjson")
+
+    def raise_for_status(self):
+        self.response.raise_for_status()
+
+    async def iter_bytes(self):
+        error = None
+        try:
+            async for chunk in self.response.aiter_bytes():
+                yield chunk
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            await self.aclose(error)
+
+    async def aclose(self, error=None):
+        if self._closed:
+            return
+        self._closed = True
+        await self.response.aclose()
+        upstream_metrics.finished(self.latency, error)
+
+
+async def open_ml_stream(url, payload, headers=None):
+    """POST в ML-сервис с потоковым чтением ответа; поток нужно дочитать или закрыть (aclose)"""
+    client = get_ml_client()
+    upstream_metrics.started()
+    started = time.perf_counter()
+    try:
+        response = await client.send(client.build_request("POST", url, json=payload, headers=headers), stream=True)
+    except Exception as exc:
+        upstream_metrics.finished(time.perf_counter() - started, exc)
+        raise
+    return MLStream(response, started)
+
+
+def get_ml_client_stats():
+    return {**upstream_metrics.stats(), "http2": _http2, "open": _client is not None}
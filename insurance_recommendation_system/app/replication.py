@@ -0,0 +1,127 @@
+import threading
+import time
+
+
+def parse_lsn(lsn):
+    """Перевод LSN PostgreSQL вида '16/B374D848' в число байт"""
+    high, low = str(lsn).split("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+class ReplicationMonitor:
+    """
+    Периодически сравнивает текущий WAL LSN мастера с LSN, проигранным репликой
+    (как postgres/scripts/monitor_replication.sh). Пока отставание не превышает
+    max_lag_bytes, чтение можно направлять на реплику.
+    """
+
+    def __init__(self, fetch_master_lsn, fetch_replica_lsn, max_lag_bytes, poll_interval=5.0):
+        self.fetch_master_lsn = fetch_master_lsn
+        self.fetch_replica_lsn = fetch_replica_lsn
+        self.max_lag_bytes = max_lag_bytes
+        self.poll_interval = poll_interval
+
+        self.healthy = False
+        self.lag_bytes = None
+        self.master_lsn = None
+        self.replica_lsn = None
+        self.last_checked_at = None
+        self.last_error = None
+
+        self.replica_reads = 0
+        self.master_fallback_reads = 0
+        self.consistency_fallback_reads = 0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """Один замер отставания реплики"""
+        try:
+            master_lsn = parse_lsn(self.fetch_master_lsn())
+            replica_lsn = parse_lsn(self.fetch_replica_lsn())
+        except Exception as error:
+            self.mark_unavailable(str(error))
+            return
+
+        lag_bytes = max(0, master_lsn - replica_lsn)
+        with self._lock:
+            self.master_lsn = master_lsn
+            self.replica_lsn = replica_lsn
+            self.lag_bytes = lag_bytes
+            self.healthy = lag_bytes <= self.max_lag_bytes
+            self.last_checked_at = time.time()
+            self.last_error = None if self.healthy else f"Replication lag {lag_bytes} bytes exceeds threshold"
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check()
+            self._stop.wait(self.poll_interval)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replication-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def replica_available(self):
+        return self.healthy
+
+    def replica_caught_up(self, lsn, refresh=True):
+        """
+        Проиграла ли реплика WAL до lsn. Последнего замера может не хватить —
+        тогда (если refresh) LSN реплики запрашивается заново
+        """
+        if self.replica_lsn is not None and self.replica_lsn >= lsn:
+            return True
+        if not refresh:
+            return False
+
+        try:
+            replica_lsn = parse_lsn(self.fetch_replica_lsn())
+        except Exception as error:
+            self.mark_unavailable(str(error))
+            return False
+
+        with self._lock:
+            self.replica_lsn = replica_lsn
+        return replica_lsn >= lsn
+
+    def record_consistency_fallback(self):
+        with self._lock:
+            self.consistency_fallback_reads += 1
+
+    def mark_unavailable(self, reason):
+        """Реплика не используется до следующего успешного замера"""
+        with self._lock:
+            self.healthy = False
+            self.last_error = reason
+            self.last_checked_at = time.time()
+
+    def record_read(self, on_replica):
+        with self._lock:
+            if on_replica:
+                self.replica_reads += 1
+            else:
+                self.master_fallback_reads += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "replica_available": self.healthy,
+                "lag_bytes": self.lag_bytes,
+                "max_lag_bytes": self.max_lag_bytes,
+                "last_checked_at": self.last_checked_at,
+                "last_error": self.last_error,
+                "replica_reads": self.replica_reads,
+                "master_fallback_reads": self.master_fallback_reads,
+                "consistency_fallback_reads": self.consistency_fallback_reads,
+            }
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, status
 from app.database import execute_sql_file
+from app.async_database import execute_sql_file_async
 from app.models.user_models import UserCreate, UserLogin, Token
 from app.utils.auth import create_access_token, get_password_hash, verify_password
 from app.services.email_service import send_verification_email
@@ -16,7 +17,7 @@ router = APIRouter(
 async def register_user(user: UserCreate):
     """Register a new user"""
     # Проверка на существующего пользователя должна быть на мастере, чтобы избежать проблем с задержкой репликации
-    existing_user = execute_sql_file("users/get_user_by_email.sql", {"email": user.email}, read_only=False)
+    existing_user = await execute_sql_file_async("users/get_user_by_email.sql", {"email": user.email}, read_only=False)
 
     if existing_user:
         raise HTTPException(
@@ -27,14 +28,14 @@ async def register_user(user: UserCreate):
     hashed_password = get_password_hash(user.password)
 
     # Запись нового пользователя на мастер
-    execute_sql_file("users/create_user.sql", {
+    await execute_sql_file_async("users/create_user.sql", {
         "name": user.user_name,
         "email": user.email,
         "password": hashed_password
     }, read_only=False)
 
     # Получение созданного пользователя с мастера
-    created_user = execute_sql_file("users/get_user_by_email.sql", {"email": user.email}, read_only=False)[0]
+    created_user = (await execute_sql_file_async("users/get_user_by_email.sql", {"email": user.email}, read_only=False))[0]
 
     try:
         await send_verification_email(user.email, created_user["id"])
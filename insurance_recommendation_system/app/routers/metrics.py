@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from app.database import get_pool_stats, replication_monitor
+from app.async_database import get_async_pool_stats
+from app.ml_client import get_ml_client_stats
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+
+@router.get("", response_model=dict)
+def get_metrics():
+    """Runtime metrics of the gateway"""
+    return {
+        "database_pools": get_pool_stats(),
+        "async_database_pools": get_async_pool_stats(),
+        "replication": replication_monitor.stats(),
+        "recommendation_client": get_ml_client_stats()
+    }
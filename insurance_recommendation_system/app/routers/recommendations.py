@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException, status
-from app.database import execute_sql_file
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from app.async_database import execute_sql_file_async
+from app.ml_client import post_to_ml, open_ml_stream
 from app.models.recommendation_models import (RecommendationWithInsurance, InsuranceRecommendationRequest,
                                               UserCheckInfo, SuccessResponse)
 import os
@@ -19,7 +21,7 @@ router = APIRouter(
 async def check_recommendation(request: UserCheckInfo):
     """Set a flag that user already checked for a product"""
 
-    user = execute_sql_file("users/get_user_by_email.sql", {"email": request.user_email}, read_only=False)
+    user = await execute_sql_file_async("users/get_user_by_email.sql", {"email": request.user_email}, read_only=False)
 
     if not user:
         raise HTTPException(
@@ -29,7 +31,7 @@ async def check_recommendation(request: UserCheckInfo):
 
     sql_params = {"user_id": user[0]["id"], "product_id": request.product_id}
 
-    execute_sql_file("insurances/insert_product_view.sql", sql_params, read_only=False)
+    await execute_sql_file_async("insurances/insert_product_view.sql", sql_params, read_only=False)
 
     return SuccessResponse()
 
@@ -45,30 +47,79 @@ async def get_recommendations(request: InsuranceRecommendationRequest):
             detail="RECOMMENDATION_API_URL environment variable is not set"
         )
 
-    timeout = httpx.Timeout(120.0, connect=10.0)
-
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        try:
-            print(f"Sending request to recommendation system: {recommendation_system_url}")
-
-            response = await client.post(recommendation_system_url, json=request.dict())
-            response.raise_for_status()
-
-            print("Successfully received response from recommendation system")
-            return response.json()
-
-        except httpx.TimeoutException:
-            raise HTTPException(
-                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
-                detail="Recommendation system did not respond within 60 seconds"
-            )
-        except httpx.HTTPStatusError as exc:
-            raise HTTPException(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                detail=f"Error communicating with recommendation system: {exc.response.status_code}"
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error: {str(e)}"
-            )
+    try:
+        print(f"Sending request to recommendation system: {recommendation_system_url}")
+
+        response = await post_to_ml(recommendation_system_url, request.dict())
+        response.raise_for_status()
+
+        print("Successfully received response from recommendation system")
+        return response.json()
+
+    except httpx.TimeoutException:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Recommendation system did not respond within 60 seconds"
+        )
+    except httpx.HTTPStatusError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Error communicating with recommendation system: {exc.response.status_code}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error: {str(e)}"
+        )
+
+
+@router.post("/get_recommendations/stream")
+async def stream_recommendations(request: InsuranceRecommendationRequest, http_request: Request):
+    """
+    Stream recommendations from the recommendation system: ranked products first, then
+    the generated texts of each product as they are ready. NDJSON by default, Server-Sent
+    Events with Accept: text/event-stream. The stream is relayed without buffering.
+    """
+    recommendation_system_url = os.getenv('RECOMMENDATION_API_URL')
+
+    if not recommendation_system_url:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="RECOMMENDATION_API_URL environment variable is not set"
+        )
+
+    stream = None
+    try:
+        print(f"Opening recommendation stream: {recommendation_system_url}/stream")
+
+        stream = await open_ml_stream(
+            f"{recommendation_system_url}/stream",
+            request.dict(),
+            headers={"Accept": http_request.headers.get("accept", "application/x-ndjson")}
+        )
+        stream.raise_for_status()
+
+    except httpx.TimeoutException:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Recommendation system did not respond within 60 seconds"
+        )
+    except httpx.HTTPStatusError as exc:
+        await stream.aclose(exc)
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Error communicating with recommendation system: {exc.response.status_code}"
+        )
+    except Exception as e:
+        if stream is not None:
+            await stream.aclose(e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error: {str(e)}"
+        )
+
+    return StreamingResponse(
+        stream.iter_bytes(),
+        media_type=stream.media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from fastapi import status
 from jose import jwt
 import json
@@ -26,6 +26,29 @@ class TestAuthFlow:
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert "Invalid verification token" in response.json()["detail"]
 
+    @patch("app.routers.auth.send_verification_email", new_callable=AsyncMock)
+    @patch("app.routers.auth.execute_sql_file_async", new_callable=AsyncMock)
+    def test_register_user(self, mock_execute_sql, mock_send_email, client, test_user):
+        mock_execute_sql.side_effect = [
+            [],
+            None,
+            [{"id": 1, "email": test_user["email"]}]
+        ]
+
+        response = client.post(
+            "/auth/register",
+            json={
+                "user_name": test_user["user_name"],
+                "email": test_user["email"],
+                "password": test_user["password"]
+            }
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["code"] == 0
+        assert mock_execute_sql.await_count == 3
+        mock_send_email.assert_awaited_once_with(test_user["email"], 1)
+
     @patch("app.routers.auth.execute_sql_file")
     @patch("app.routers.auth.verify_password")
     def test_login_successful(self, mock_verify_password, mock_execute_sql, client, test_user):
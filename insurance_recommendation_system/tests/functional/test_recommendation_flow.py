@@ -2,12 +2,13 @@ import pytest
 from unittest.mock import patch, AsyncMock
 from fastapi import status
 import httpx
+import json
 
 
 @pytest.mark.functional
 class TestRecommendationFlow:
 
-    @patch("app.routers.recommendations.execute_sql_file")
+    @patch("app.routers.recommendations.execute_sql_file_async", new_callable=AsyncMock)
     def test_check_recommendation(self, mock_execute_sql, client):
         mock_execute_sql.side_effect = [
             [{"id": 1, "email": "test@example.com"}],
@@ -29,7 +30,7 @@ class TestRecommendationFlow:
 
         assert mock_execute_sql.call_count == 2
 
-    @patch("app.routers.recommendations.execute_sql_file")
+    @patch("app.routers.recommendations.execute_sql_file_async", new_callable=AsyncMock)
     def test_check_recommendation_user_not_found(self, mock_execute_sql, client):
         mock_execute_sql.return_value = []
 
@@ -43,3 +44,86 @@ class TestRecommendationFlow:
 
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert "User with this email not found" in response.json()["detail"]
+
+    def test_get_recommendations_reuses_shared_client(self, client, recommendation_request,
+                                                      mock_insurance_data, monkeypatch):
+        from app import ml_client
+
+        seen = []
+
+        def handler(request):
+            seen.append(request.url)
+            return httpx.Response(200, json=mock_insurance_data)
+
+        monkeypatch.setenv("RECOMMENDATION_API_URL", "http://ml.test/api/recommendations")
+        monkeypatch.setattr(ml_client, "_client", None)
+        monkeypatch.setattr(ml_client, "upstream_metrics", ml_client.UpstreamMetrics(max_connections=10))
+        shared = ml_client.start_ml_client(transport=httpx.MockTransport(handler))
+
+        for _ in range(2):
+            response = client.post("/recommendation/get_recommendations", json=recommendation_request)
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json()[0]["product_id"] == 1
+
+        assert ml_client.get_ml_client() is shared
+        assert len(seen) == 2
+
+        stats = client.get("/metrics").json()["recommendation_client"]
+        assert stats["requests"] == 2
+        assert stats["errors"] == 0
+        assert stats["in_flight"] == 0
+
+    def test_stream_recommendations_relays_events(self, client, recommendation_request,
+                                                  mock_insurance_data, monkeypatch):
+        from app import ml_client
+
+        events = [
+            {"event": "ranked", "data": mock_insurance_data},
+            {"event": "product", "data": {"product_id": 1, "recommendation_reason": "Подходит"}},
+            {"event": "done", "data": {}},
+        ]
+        seen = []
+
+        async def body():
+            for event in events:
+                yield (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+        def handler(request):
+            seen.append((request.url, request.headers["accept"]))
+            return httpx.Response(200, headers={"content-type": "application/x-ndjson"}, content=body())
+
+        monkeypatch.setenv("RECOMMENDATION_API_URL", "http://ml.test/api/recommendations")
+        monkeypatch.setattr(ml_client, "_client", None)
+        monkeypatch.setattr(ml_client, "upstream_metrics", ml_client.UpstreamMetrics(max_connections=10))
+        ml_client.start_ml_client(transport=httpx.MockTransport(handler))
+
+        with client.stream("POST", "/recommendation/get_recommendations/stream",
+                           json=recommendation_request, headers={"Accept": "application/x-ndjson"}) as response:
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            received = [json.loads(line) for line in response.iter_lines() if line]
+
+        assert received == events
+        assert seen == [("http://ml.test/api/recommendations/stream", "application/x-ndjson")]
+
+        stats = client.get("/metrics").json()["recommendation_client"]
+        assert stats["requests"] == 1
+        assert stats["in_flight"] == 0
+
+    def test_stream_recommendations_upstream_error(self, client, recommendation_request, monkeypatch):
+        from app import ml_client
+
+        monkeypatch.setenv("RECOMMENDATION_API_URL", "http://ml.test/api/recommendations")
+        monkeypatch.setattr(ml_client, "_client", None)
+        monkeypatch.setattr(ml_client, "upstream_metrics", ml_client.UpstreamMetrics(max_connections=10))
+        ml_client.start_ml_client(transport=httpx.MockTransport(
+            lambda request: httpx.Response(503, json={"detail": "Recommendation service is warming up"})
+        ))
+
+        response = client.post("/recommendation/get_recommendations/stream", json=recommendation_request)
+
+        assert response.status_code == status.HTTP_502_BAD_GATEWAY
+        assert "503" in response.json()["detail"]
+        stats = client.get("/metrics").json()["recommendation_client"]
+        assert stats["errors"] == 1
+        assert stats["in_flight"] == 0
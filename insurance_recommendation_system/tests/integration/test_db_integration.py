@@ -1,19 +1,37 @@
+import asyncio
+import contextvars
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import psycopg2
+from app import database
 from app.database import execute_sql_file, get_db, get_slave_db
+from app.db_pool import ConnectionPool, PoolTimeoutError
+from app.async_database import execute_sql_file_async
+from app.replication import ReplicationMonitor, parse_lsn
+from app.consistency import begin_request, response_token
 
 
 @pytest.mark.integration
 class TestDbIntegration:
 
+    @pytest.fixture(autouse=True)
+    def isolated_pools(self, monkeypatch):
+        monkeypatch.setattr(database, "_pools", {})
+        monkeypatch.setattr(database, "_sql_registry", {})
+
+    @staticmethod
+    def make_connection(cursor):
+        mock_conn = MagicMock()
+        mock_conn.closed = 0
+        mock_conn.cursor.return_value = cursor
+        return mock_conn
+
     @patch("psycopg2.connect")
     def test_execute_sql_file_read(self, mock_connect, monkeypatch):
         mock_cursor = MagicMock()
         mock_cursor.fetchall.return_value = [{"id": 1, "name": "test"}]
 
-        mock_conn = MagicMock()
-        mock_conn.cursor.return_value = mock_cursor
+        mock_conn = self.make_connection(mock_cursor)
         mock_connect.return_value = mock_conn
 
         mock_file = MagicMock()
@@ -26,15 +44,14 @@ class TestDbIntegration:
         mock_cursor.execute.assert_called_once_with("SELECT * FROM test", {"param": "value"})
         mock_conn.commit.assert_called_once()
         mock_cursor.close.assert_called_once()
-        mock_conn.close.assert_called_once()
+        mock_conn.close.assert_not_called()
 
     @patch("psycopg2.connect")
     def test_execute_sql_file_write(self, mock_connect, monkeypatch):
         mock_cursor = MagicMock()
         mock_cursor.fetchall.side_effect = psycopg2.ProgrammingError("no results")
 
-        mock_conn = MagicMock()
-        mock_conn.cursor.return_value = mock_cursor
+        mock_conn = self.make_connection(mock_cursor)
         mock_connect.return_value = mock_conn
 
         mock_file = MagicMock()
@@ -47,7 +64,7 @@ class TestDbIntegration:
         mock_cursor.execute.assert_called_once_with("INSERT INTO test VALUES (1)", {"param": "value"})
         mock_conn.commit.assert_called_once()
         mock_cursor.close.assert_called_once()
-        mock_conn.close.assert_called_once()
+        mock_conn.close.assert_not_called()
 
     @patch("psycopg2.connect")
     def test_execute_sql_file_error(self, mock_connect, monkeypatch):
@@ -60,6 +77,182 @@ class TestDbIntegration:
             with pytest.raises(psycopg2.OperationalError):
                 execute_sql_file("test.sql", {"param": "value"})
 
+    @patch("psycopg2.connect")
+    def test_execute_sql_file_reuses_connection_and_sql(self, mock_connect):
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = [{"id": 1}]
+        mock_connect.return_value = self.make_connection(mock_cursor)
+
+        mock_file = MagicMock()
+        mock_file.__enter__.return_value.read.return_value = "SELECT 1"
+
+        with patch("builtins.open", return_value=mock_file) as mock_open:
+            execute_sql_file("test.sql")
+            execute_sql_file("test.sql")
+
+        mock_open.assert_called_once()
+        mock_connect.assert_called_once()
+        stats = database.get_pool_stats()["master"]
+        assert stats["checkouts"] == 2
+        assert stats["in_use"] == 0
+        assert stats["idle"] == 1
+
+    @patch("psycopg2.connect")
+    def test_broken_connection_is_discarded(self, mock_connect):
+        broken_cursor = MagicMock()
+        broken_cursor.execute.side_effect = psycopg2.OperationalError("server closed the connection")
+        broken_conn = self.make_connection(broken_cursor)
+
+        healthy_cursor = MagicMock()
+        healthy_cursor.fetchall.return_value = [{"id": 1}]
+        mock_connect.side_effect = [broken_conn, self.make_connection(healthy_cursor)]
+
+        database._sql_registry["test.sql"] = "SELECT 1"
+
+        with pytest.raises(psycopg2.OperationalError):
+            execute_sql_file("test.sql")
+        assert execute_sql_file("test.sql") == [{"id": 1}]
+
+        broken_conn.close.assert_called_once()
+        assert mock_connect.call_count == 2
+        assert database.get_pool_stats()["master"]["discarded"] == 1
+
+    def test_pool_timeout(self):
+        pool = ConnectionPool("postgresql://test", max_size=1, timeout=0.01)
+
+        with patch("psycopg2.connect", return_value=self.make_connection(MagicMock())):
+            with pool.connection():
+                with pytest.raises(PoolTimeoutError):
+                    with pool.connection():
+                        pass
+
+        assert pool.stats()["timeouts"] == 1
+        assert pool.stats()["in_use"] == 0
+
+    def test_sql_registry_loaded_at_startup(self):
+        registry = database.load_sql_registry()
+
+        assert "users/get_user_by_email.sql" in registry
+        assert "insurances/insert_product_view.sql" in registry
+
+    def test_read_only_select_goes_to_healthy_replica(self, monkeypatch):
+        monkeypatch.setattr(database, "DATABASE_SLAVE_URL", "postgresql://replica")
+        monkeypatch.setattr(database, "replication_monitor", ReplicationMonitor(
+            lambda: "0/2000", lambda: "0/1000", max_lag_bytes=1024 * 1024
+        ))
+        database.replication_monitor.check()
+        database._sql_registry["test.sql"] = "SELECT 1"
+
+        calls = []
+        monkeypatch.setattr(database, "_execute", lambda dsn, sql, params: calls.append(dsn) or [{"id": 1}])
+
+        assert execute_sql_file("test.sql", read_only=True) == [{"id": 1}]
+        execute_sql_file("test.sql", read_only=False)
+
+        assert calls == ["postgresql://replica", database.DATABASE_URL]
+        assert database.replication_monitor.stats()["replica_reads"] == 1
+
+    def test_read_only_falls_back_to_master_when_lag_is_high(self, monkeypatch):
+        monkeypatch.setattr(database, "DATABASE_SLAVE_URL", "postgresql://replica")
+        monkeypatch.setattr(database, "replication_monitor", ReplicationMonitor(
+            lambda: "1/0", lambda: "0/0", max_lag_bytes=1024 * 1024
+        ))
+        database.replication_monitor.check()
+        database._sql_registry["test.sql"] = "SELECT 1"
+
+        calls = []
+        monkeypatch.setattr(database, "_execute", lambda dsn, sql, params: calls.append(dsn) or [])
+
+        execute_sql_file("test.sql", read_only=True)
+
+        assert calls == [database.DATABASE_URL]
+        assert database.replication_monitor.stats()["lag_bytes"] == 1 << 32
+        assert database.replication_monitor.stats()["master_fallback_reads"] == 1
+
+    def test_read_only_falls_back_to_master_when_replica_fails(self, monkeypatch):
+        monkeypatch.setattr(database, "DATABASE_SLAVE_URL", "postgresql://replica")
+        monkeypatch.setattr(database, "replication_monitor", ReplicationMonitor(
+            lambda: "0/0", lambda: "0/0", max_lag_bytes=0
+        ))
+        database.replication_monitor.check()
+        database._sql_registry["test.sql"] = "SELECT 1"
+
+        def execute(dsn, sql, params):
+            if dsn == "postgresql://replica":
+                raise psycopg2.OperationalError("replica is down")
+            return [{"id": 1}]
+
+        monkeypatch.setattr(database, "_execute", execute)
+
+        assert execute_sql_file("test.sql", read_only=True) == [{"id": 1}]
+        assert database.replication_monitor.replica_available() is False
+
+    def test_write_returns_master_lsn_as_consistency_token(self, monkeypatch):
+        monkeypatch.setattr(database, "DATABASE_SLAVE_URL", "postgresql://replica")
+        database._sql_registry["update.sql"] = "UPDATE users SET name = %(name)s"
+
+        monkeypatch.setattr(database, "_execute", lambda dsn, sql, params: None)
+        monkeypatch.setattr(database, "_fetch_lsn", lambda dsn, query: "0/3000")
+
+        def request():
+            state = begin_request()
+            execute_sql_file("update.sql", {"name": "test"})
+            return response_token(state)
+
+        assert contextvars.copy_context().run(request) == "0/3000"
+
+    def test_read_with_token_waits_for_replica_to_replay_lsn(self, monkeypatch):
+        replica_lsn = ["0/1000"]
+        monkeypatch.setattr(database, "DATABASE_SLAVE_URL", "postgresql://replica")
+        monkeypatch.setattr(database, "replication_monitor", ReplicationMonitor(
+            lambda: "0/3000", lambda: replica_lsn[0], max_lag_bytes=1024 * 1024
+        ))
+        database.replication_monitor.check()
+        database._sql_registry["test.sql"] = "SELECT 1"
+
+        calls = []
+        monkeypatch.setattr(database, "_execute", lambda dsn, sql, params: calls.append(dsn) or [])
+
+        def request(token):
+            begin_request(token)
+            execute_sql_file("test.sql", read_only=True)
+
+        contextvars.copy_context().run(request, "0/3000")
+        replica_lsn[0] = "0/3000"
+        contextvars.copy_context().run(request, "0/3000")
+        contextvars.copy_context().run(request, "not-a-token")
+
+        assert calls == [database.DATABASE_URL, "postgresql://replica", "postgresql://replica"]
+        assert database.replication_monitor.stats()["consistency_fallback_reads"] == 1
+
+    def test_parse_lsn(self):
+        assert parse_lsn("0/0") == 0
+        assert parse_lsn("16/B374D848") == (0x16 << 32) + 0xB374D848
+
+    def test_execute_sql_file_async(self, monkeypatch):
+        mock_cursor = MagicMock()
+        mock_cursor.description = [("id",)]
+        mock_cursor.execute = AsyncMock()
+        mock_cursor.fetchall = AsyncMock(return_value=[{"id": 1}])
+        mock_cursor.__aenter__ = AsyncMock(return_value=mock_cursor)
+        mock_cursor.__aexit__ = AsyncMock(return_value=False)
+
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_conn.__aenter__ = AsyncMock(return_value=mock_conn)
+        mock_conn.__aexit__ = AsyncMock(return_value=False)
+
+        mock_pool = MagicMock()
+        mock_pool.connection.return_value = mock_conn
+
+        database._sql_registry["test.sql"] = "SELECT * FROM test WHERE id = %(id)s"
+
+        with patch("app.async_database.get_async_pool", AsyncMock(return_value=mock_pool)):
+            result = asyncio.run(execute_sql_file_async("test.sql", {"id": 1}))
+
+        assert result == [{"id": 1}]
+        mock_cursor.execute.assert_awaited_once_with("SELECT * FROM test WHERE id = %(id)s", {"id": 1})
+
     def test_get_db(self):
         db_gen = get_db()
 
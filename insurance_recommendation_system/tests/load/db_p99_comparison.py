@@ -0,0 +1,72 @@
+"""
+Step load test for the async database routes: requests/sec at a fixed p99.
+
+The number of users grows in steps; for every step the test records throughput and p99
+latency and, when stopped, reports the highest requests/sec whose p99 stays within P99_TARGET_MS.
+Run it against the gateway before and after switching routes to execute_sql_file_async
+and compare the reported numbers:
+
+    cd tests/load
+    P99_TARGET_MS=200 locust -f db_p99_comparison.py --headless --host http://localhost:8000
+"""
+from locust import LoadTestShape, events
+from scenarios.database_load import DatabaseRouteUser
+import logging
+import os
+import time
+
+P99_TARGET_MS = float(os.getenv("P99_TARGET_MS", "200"))
+STEP_USERS = int(os.getenv("STEP_USERS", "10"))
+STEP_DURATION = int(os.getenv("STEP_DURATION", "30"))
+MAX_STEPS = int(os.getenv("MAX_STEPS", "10"))
+
+step_response_times = {}
+test_started_at = None
+
+
+class StepLoadShape(LoadTestShape):
+    """
+    Adds STEP_USERS users every STEP_DURATION seconds, MAX_STEPS times
+    """
+
+    def tick(self):
+        run_time = self.get_run_time()
+        step = int(run_time // STEP_DURATION)
+
+        if step >= MAX_STEPS:
+            return None
+
+        return (step + 1) * STEP_USERS, STEP_USERS
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    global test_started_at
+    test_started_at = time.monotonic()
+    step_response_times.clear()
+
+
+@events.request.add_listener
+def on_request(request_type, name, response_time, response_length, exception, **kwargs):
+    if test_started_at is None or exception is not None:
+        return
+
+    step = int((time.monotonic() - test_started_at) // STEP_DURATION)
+    step_response_times.setdefault(step, []).append(response_time)
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    best_rps = 0.0
+
+    for step in sorted(step_response_times):
+        response_times = sorted(step_response_times[step])
+        p99 = response_times[min(len(response_times) - 1, int(len(response_times) * 0.99))]
+        rps = len(response_times) / STEP_DURATION
+        logging.info(f"Step {step + 1}: {(step + 1) * STEP_USERS} users, {rps:.1f} req/s, p99 {p99:.0f} ms")
+
+        if p99 <= P99_TARGET_MS:
+            best_rps = max(best_rps, rps)
+
+    logging.info(f"Max throughput with p99 <= {P99_TARGET_MS:.0f} ms: {best_rps:.1f} req/s")
+
@@ -0,0 +1,47 @@
+from locust import HttpUser, task, between
+import random
+import logging
+
+
+class DatabaseRouteUser(HttpUser):
+    """
+    Locust user class for the async database routes: product view tracking and registration
+    """
+    wait_time = between(0.1, 0.5)
+
+    def on_start(self):
+        """Initialize user with random credentials"""
+        self.user_id = random.randint(100000, 999999)
+        self.email = f"loadtest_db_{self.user_id}@example.com"
+
+    @task(10)
+    def check_recommendation(self):
+        """Task to record a product view"""
+        check_data = {
+            "product_id": random.randint(1, 35),
+            "user_email": self.email
+        }
+
+        with self.client.post("/recommendation/check_recommendation", json=check_data,
+                              catch_response=True) as response:
+            if response.status_code in (200, 404):
+                response.success()
+            else:
+                logging.error(f"Failed to check recommendation: {response.status_code}, {response.text}")
+                response.failure(f"Check recommendation failed with status code: {response.status_code}")
+
+    @task(1)
+    def register_user(self):
+        """Task to register a new user"""
+        user_data = {
+            "user_name": f"loadtest_db_{self.user_id}",
+            "email": self.email,
+            "password": "LoadTest123!"
+        }
+
+        with self.client.post("/auth/register", json=user_data, catch_response=True) as response:
+            if response.status_code == 200 or (response.status_code == 400 and "already exists" in response.text):
+                response.success()
+            else:
+                logging.error(f"Failed to register user: {response.status_code}, {response.text}")
+                response.failure(f"Registration failed with status code: {response.status_code}")
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException, status
-from typing import List
+import json
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
 from app.models.insurance_models import InsuranceRecommendation, InsuranceRecommendationRequest
-from app.services.recommendation_service import RecommendationService
+from app.services.recommendation_service import RecommendationService, ServiceNotReadyError
+from app.services.inference_executor import InferenceQueueFullError
 
 router = APIRouter()
 recommendation_service = RecommendationService()
@@ -16,8 +19,85 @@ async def get_recommendations(request: InsuranceRecommendationRequest):
     try:
         recommendations = await recommendation_service.get_recommendations(request)
         return recommendations
+    except (InferenceQueueFullError, ServiceNotReadyError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error generating recommendations: {str(e)}"
+        )
+
+def _format_event(name: str, data: Any, sse: bool) -> str:
+    if isinstance(data, list):
+        data = [item.dict() for item in data]
+    elif hasattr(data, "dict"):
+        data = data.dict()
+
+    if sse:
+        return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return json.dumps({"event": name, "data": data}, ensure_ascii=False) + "\n"
+
+
+async def _relay_events(first: Tuple[str, Any], events: AsyncIterator[Tuple[str, Any]], sse: bool):
+    yield _format_event(*first, sse)
+    try:
+        async for name, data in events:
+            yield _format_event(name, data, sse)
+    except Exception as e:
+        # Статус ответа уже отправлен: ошибка передаётся событием
+        print(f"Error streaming recommendations: {e}")
+        yield _format_event("error", {"detail": f"Error generating recommendations: {str(e)}"}, sse)
+        return
+    yield _format_event("done", {}, sse)
+
+
+@router.post("/recommendations/stream")
+async def stream_recommendations(request: InsuranceRecommendationRequest, http_request: Request):
+    """
+    Streaming variant of /recommendations: a "ranked" event with the selected products,
+    prices and scores right after ranking, then a "product" event with the generated texts
+    of each product as soon as they are ready, and "done" at the end.
+    NDJSON by default, Server-Sent Events if the client accepts text/event-stream.
+    """
+    sse = "text/event-stream" in http_request.headers.get("accept", "")
+    events = recommendation_service.stream_recommendations(request)
+    try:
+        # Ранжирование выполняется до ответа, чтобы его ошибки вернулись обычным HTTP-статусом
+        first = await events.__anext__()
+    except (InferenceQueueFullError, ServiceNotReadyError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error generating recommendations: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+    return StreamingResponse(
+        _relay_events(first, events, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/ready", response_model=Dict[str, Any])
+async def ready():
+    """
+    Readiness probe: 200 after the catalog, model and warm-up are done, 503 before that.
+    """
+    startup = recommendation_service.startup.stats()
+    status_code = status.HTTP_200_OK if startup["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=status_code, content=startup)
+
+
+@router.get("/metrics", response_model=Dict[str, Any])
+async def get_metrics():
+    """
+    Runtime metrics of the recommendation service.
+    """
+    return recommendation_service.get_metrics()
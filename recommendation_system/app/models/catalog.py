@@ -0,0 +1,145 @@
+import sys
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from app.models.scoring import ScoringIndex
+
+# duration_months может быть NULL: в колонке хранится как -1
+NO_DURATION = -1
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def normalize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Строка выборки в тех же типах, что отдаёт CatalogSnapshot.row (Decimal -> float)"""
+    normalized = dict(row)
+    normalized['product_id'] = int(row['product_id'])
+    normalized['premium'] = float(row['premium'])
+    normalized['coverage'] = float(row['coverage'])
+    normalized['duration'] = int(row['duration']) if row.get('duration') is not None else None
+    return normalized
+
+
+class InsuranceRecord:
+    """Текстовые поля продукта; числовые поля и категория хранятся колонками снимка."""
+
+    __slots__ = ('product_name', 'description', 'provider', 'updated_at')
+
+    def __init__(self, product_name: str, description: Optional[str], provider: str, updated_at: Any = None):
+        self.product_name = product_name
+        self.description = description
+        self.provider = _intern(provider)
+        self.updated_at = updated_at
+
+
+class CatalogSnapshot:
+    """
+    Версия каталога вместе с производными от неё индексами. Запрос один раз берёт
+    ссылку на текущий снимок и работает только с ним; обновление каталога строит
+    новый снимок и подменяет ссылку целиком, поэтому продукты, их версия и индекс
+    скоринга всегда согласованы между собой.
+
+    Каталог хранится колонками: product_id, premium, coverage, duration и номер
+    категории — массивы NumPy, названия категорий интернированы и хранятся один раз,
+    текстовые поля — в записях InsuranceRecord. Ранжирование и расчёт цены читают
+    колонки напрямую, словарь продукта собирается только для попавших в выдачу.
+    """
+
+    __slots__ = ('version', 'watermark', 'product_ids', 'premium', 'coverage', 'duration', 'category_ids',
+                 'category_names', 'category_descriptions', 'records', '_scoring_index', '_lock')
+
+    def __init__(self, insurances: Sequence[Dict[str, Any]], version: Optional[str] = None, watermark: Any = None):
+        self.version = version
+        # Наибольший updated_at среди загруженных строк — граница для инкрементального обновления
+        self.watermark = watermark
+
+        size = len(insurances)
+        self.product_ids = np.empty(size, dtype=np.int64)
+        self.premium = np.empty(size, dtype=np.float64)
+        self.coverage = np.empty(size, dtype=np.float64)
+        self.duration = np.empty(size, dtype=np.int32)
+        self.category_ids = np.empty(size, dtype=np.int32)
+        self.category_names: List[str] = []
+        self.category_descriptions: List[Optional[str]] = []
+        self.records: List[InsuranceRecord] = []
+
+        categories: Dict[str, int] = {}
+        for position, insurance in enumerate(insurances):
+            category_name = insurance['category_name']
+            category_id = categories.get(category_name)
+            if category_id is None:
+                category_id = categories[category_name] = len(self.category_names)
+                self.category_names.append(_intern(category_name))
+                self.category_descriptions.append(insurance.get('category_description'))
+
+            duration = insurance.get('duration')
+            self.product_ids[position] = int(insurance['product_id'])
+            self.premium[position] = float(insurance['premium'])
+            self.coverage[position] = float(insurance['coverage'])
+            self.duration[position] = NO_DURATION if duration is None else int(duration)
+            self.category_ids[position] = category_id
+            self.records.append(InsuranceRecord(insurance['product_name'], insurance.get('description'),
+                                                insurance['provider'], insurance.get('updated_at')))
+
+        self._scoring_index: Optional[ScoringIndex] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def row(self, position: int) -> Dict[str, Any]:
+        """Продукт в виде словаря (формат строки get_insurances.sql)"""
+        record = self.records[position]
+        category_id = self.category_ids[position]
+        duration = int(self.duration[position])
+        return {
+            'product_id': int(self.product_ids[position]),
+            'product_name': record.product_name,
+            'description': record.description,
+            'premium': float(self.premium[position]),
+            'coverage': float(self.coverage[position]),
+            'duration': None if duration == NO_DURATION else duration,
+            'category_name': self.category_names[category_id],
+            'category_description': self.category_descriptions[category_id],
+            'provider': record.provider,
+            'updated_at': record.updated_at,
+        }
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        return (self.row(position) for position in range(len(self)))
+
+    def category_name(self, position: int) -> str:
+        return self.category_names[self.category_ids[position]]
+
+    def nbytes(self) -> int:
+        """Размер числовых колонок в байтах (без текстовых записей)"""
+        return sum(column.nbytes for column in (self.product_ids, self.premium, self.coverage,
+                                                self.duration, self.category_ids))
+
+    def scoring_index(self, format_info: Callable[[Dict[str, Any]], str]) -> ScoringIndex:
+        """Индекс скоринга строится один раз на снимок (при обновлении — до подмены снимка)."""
+        if self._scoring_index is None:
+            with self._lock:
+                if self._scoring_index is None:
+                    infos = []
+                    for insurance in self.rows():
+                        try:
+                            infos.append(format_info(insurance))
+                        except Exception as e:
+                            print(f"Error scoring insurance {insurance.get('product_id', 'unknown')}: {e}")
+                            infos.append(None)
+                    self._scoring_index = ScoringIndex(infos)
+        return self._scoring_index
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "products": len(self),
+            "categories": len(self.category_names),
+            "column_bytes": self.nbytes(),
+            "watermark": str(self.watermark) if self.watermark is not None else None,
+        }
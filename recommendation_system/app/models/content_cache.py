@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+CategoryContent = Dict[str, List[str]]
+
+
+class CategoryContentCache:
+    """
+    Ограниченный LRU-кэш с TTL для сгенерированного по категории контента
+    (features, suitable_for, risks_covered). Ключ — (версия модели, категория).
+    """
+
+    def __init__(self, model_version: str, max_size: int = 256, ttl_seconds: float = 3600.0):
+        self.model_version = model_version
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, CategoryContent]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key(self, category_name: str) -> Tuple[str, str]:
+        return self.model_version, category_name
+
+    def get(self, category_name: str) -> Optional[CategoryContent]:
+        key = self._key(category_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, content = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return {field: list(items) for field, items in content.items()}
+
+    def put(self, category_name: str, content: CategoryContent) -> None:
+        key = self._key(category_name)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, content)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, category_name: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(self._key(category_name))
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def set_model_version(self, model_version: str) -> None:
+        """Записи прежней версии модели недостижимы по ключу и удаляются сразу"""
+        with self._lock:
+            if model_version != self.model_version:
+                self.model_version = model_version
+                self._entries.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model_version": self.model_version,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,138 @@
+import json
+import os
+import sys
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.models.content_cache import CategoryContent
+
+PRODUCTS_DATA_PATH = os.getenv("PRODUCTS_DATA_PATH", "model/products_data.json")
+# Продукты из БД не совпадают с файлом ни по id, ни по названию, поэтому по умолчанию им
+# отдаётся общий контент их категории (через CATEGORY_ALIASES): особенности и риски у всех
+# продуктов категории одинаковые, зато генерация нужна только для категорий, которых нет
+# в файле. false — контент по категории не подставляется, остальные продукты генерируются.
+CONTENT_STORE_CATEGORY_FALLBACK = os.getenv("CONTENT_STORE_CATEGORY_FALLBACK", "true").lower() == "true"
+
+CONTENT_FIELDS = ('features', 'suitable_for', 'risks_covered')
+
+# Категории каталога в БД называются по-английски, а в products_data.json — по-русски.
+CATEGORY_ALIASES = {
+    'Life Insurance': 'Страхование жизни',
+    'Health Insurance': 'Медицинское страхование',
+    'Auto Insurance': 'Автострахование',
+    'Home Insurance': 'Страхование недвижимости',
+    'Travel Insurance': 'Страхование путешествий',
+}
+
+CATEGORY_LIMITS = {'features': 4, 'suitable_for': 3, 'risks_covered': 5}
+
+_Content = Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]
+
+
+def _normalize(value: Any) -> str:
+    return " ".join(str(value).split()).lower()
+
+
+class ProductContentStore:
+    """
+    Предрассчитанный контент продуктов (features, suitable_for, risks_covered)
+    из products_data.json. Поиск по product_id и названию продукта — O(1) по словарям;
+    с category_fallback — в последнюю очередь по категории (объединённый контент).
+
+    Записи файла могут дополнительно содержать "product_id" (id продукта в БД)
+    и "category_name" (название категории в БД).
+    """
+
+    def __init__(self, entries: Iterable[Dict[str, Any]] = (),
+                 category_fallback: bool = CONTENT_STORE_CATEGORY_FALLBACK):
+        self.category_fallback = category_fallback
+        self._by_product_id: Dict[int, _Content] = {}
+        self._by_name: Dict[str, _Content] = {}
+        self._by_category: Dict[str, _Content] = {}
+        self._shared: Dict[_Content, _Content] = {}
+        self._lock = threading.Lock()
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        category_items: Dict[str, Dict[str, List[str]]] = {}
+
+        for entry in entries:
+            content = self._intern_content(entry)
+            self._size += 1
+
+            if entry.get('product_id') is not None:
+                self._by_product_id[int(entry['product_id'])] = content
+            if entry.get('name'):
+                self._by_name[_normalize(entry['name'])] = content
+
+            category = entry.get('category_name') or entry.get('category')
+            if category and category_fallback:
+                items = category_items.setdefault(_normalize(category), {field: [] for field in CONTENT_FIELDS})
+                for field, values in zip(CONTENT_FIELDS, content):
+                    items[field].extend(value for value in values if value not in items[field])
+
+        for category, items in category_items.items():
+            self._by_category[category] = self._share(tuple(
+                tuple(items[field][:CATEGORY_LIMITS[field]]) for field in CONTENT_FIELDS
+            ))
+
+    @classmethod
+    def load(cls, path: str = PRODUCTS_DATA_PATH,
+             category_fallback: bool = CONTENT_STORE_CATEGORY_FALLBACK) -> "ProductContentStore":
+        try:
+            with open(path, 'r', encoding='utf-8') as data_file:
+                entries = json.load(data_file)
+        except FileNotFoundError:
+            print(f"Products data file {path} not found, content store is empty")
+            return cls(category_fallback=category_fallback)
+
+        store = cls(entries, category_fallback)
+        print(f"Loaded content for {len(store)} products and {len(store._by_category)} categories from {path}")
+        return store
+
+    def _share(self, content: _Content) -> _Content:
+        return self._shared.setdefault(content, content)
+
+    def _intern_content(self, entry: Dict[str, Any]) -> _Content:
+        return self._share(tuple(
+            tuple(sys.intern(str(value)) for value in entry.get(field) or ()) for field in CONTENT_FIELDS
+        ))
+
+    def _find(self, insurance: Dict[str, Any]) -> Optional[_Content]:
+        content = self._by_product_id.get(insurance.get('product_id'))
+        if content is None and insurance.get('product_name'):
+            content = self._by_name.get(_normalize(insurance['product_name']))
+        if content is None and self.category_fallback and insurance.get('category_name'):
+            category = insurance['category_name']
+            content = self._by_category.get(_normalize(CATEGORY_ALIASES.get(category, category)))
+        return content
+
+    def lookup(self, insurance: Dict[str, Any]) -> Optional[CategoryContent]:
+        content = self._find(insurance)
+        with self._lock:
+            if content is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return {field: list(values) for field, values in zip(CONTENT_FIELDS, content)}
+
+    def __contains__(self, insurance: Dict[str, Any]) -> bool:
+        return self._find(insurance) is not None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "products": len(self),
+                "categories": len(self._by_category),
+                "category_fallback": self.category_fallback,
+                "distinct_contents": len(self._shared),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,172 @@
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_INDEX_PATH = os.getenv("EMBEDDING_INDEX_PATH", "model_cache/embedding_index")
+
+Encoder = Callable[[List[str]], np.ndarray]
+# (векторы, product_ids, updated_at) — подменяются одним присваиванием
+_State = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def _stamp(value: Any) -> float:
+    if value is None:
+        return float('nan')
+    if hasattr(value, 'timestamp'):
+        return float(value.timestamp())
+    return float(value)
+
+
+def load_sentence_encoder(model_path: str = EMBEDDING_MODEL_PATH, device: str = "cpu") -> Encoder:
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_path, device=device)
+
+    def encode(texts: List[str]) -> np.ndarray:
+        return model.encode(texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True)
+
+    return encode
+
+
+class EmbeddingIndex:
+    """
+    Векторы продуктов в непрерывной float32-матрице (строки нормированы, порядок —
+    как в каталоге). Вектор продукта пересчитывается, только если изменился его
+    updated_at. Матрица сохраняется в .npy и при загрузке отображается в память.
+    Векторы и product_ids хранятся одним кортежем: поиск берёт его один раз и не
+    видит половину обновления, если sync подменяет индекс параллельно.
+    """
+
+    def __init__(self, encoder: Encoder, path: Optional[str] = EMBEDDING_INDEX_PATH):
+        self.encoder = encoder
+        self.path = path
+        self._state: _State = (np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int64),
+                               np.zeros(0, dtype=np.float64))
+        self._lock = threading.Lock()
+
+        self.encoded_total = 0
+        self.reused_total = 0
+
+        if path:
+            self.load(path)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._state[0]
+
+    @property
+    def product_ids(self) -> np.ndarray:
+        return self._state[1]
+
+    @property
+    def stamps(self) -> np.ndarray:
+        return self._state[2]
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def _files(self, path: str):
+        return os.path.join(path, "vectors.npy"), os.path.join(path, "meta.npz")
+
+    def load(self, path: str) -> bool:
+        vectors_file, meta_file = self._files(path)
+        if not (os.path.exists(vectors_file) and os.path.exists(meta_file)):
+            return False
+        try:
+            meta = np.load(meta_file)
+            self._state = (np.load(vectors_file, mmap_mode='r'), meta["product_ids"], meta["stamps"])
+            print(f"Loaded {len(self)} product embeddings from {path}")
+            return True
+        except Exception as e:
+            print(f"Error loading embedding index from {path}: {e}")
+            return False
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        vectors_file, meta_file = self._files(path)
+        vectors, product_ids, stamps = self._state
+        # Временные файлы у каждого процесса свои: рабочие процессы serve.py могут сохранять индекс одновременно
+        for target, write in ((vectors_file, lambda f: np.save(f, np.ascontiguousarray(vectors, dtype=np.float32))),
+                              (meta_file, lambda f: np.savez(f, product_ids=product_ids, stamps=stamps))):
+            descriptor, temp_file = tempfile.mkstemp(dir=path, prefix=os.path.basename(target) + ".", suffix=".tmp")
+            try:
+                with os.fdopen(descriptor, 'wb') as file:
+                    write(file)
+                os.replace(temp_file, target)
+            except BaseException:
+                os.unlink(temp_file)
+                raise
+
+    def sync(self, insurances: Sequence[Dict[str, Any]], documents: Sequence[str]) -> None:
+        """Приводит индекс к каталогу insurances, эмбеддинги считаются только для изменившихся продуктов."""
+        with self._lock:
+            known = {int(product_id): row for row, product_id in enumerate(self.product_ids)}
+
+            product_ids = np.array([int(insurance['product_id']) for insurance in insurances], dtype=np.int64)
+            stamps = np.array([_stamp(insurance.get('updated_at')) for insurance in insurances], dtype=np.float64)
+
+            reuse_rows, reuse_positions, changed_positions = [], [], []
+            for position, (product_id, stamp) in enumerate(zip(product_ids, stamps)):
+                row = known.get(int(product_id))
+                if row is not None and self.stamps[row] == stamp:
+                    reuse_rows.append(row)
+                    reuse_positions.append(position)
+                else:
+                    changed_positions.append(position)
+
+            if not changed_positions and reuse_rows == list(range(len(self))):
+                return
+
+            encoded = None
+            if changed_positions:
+                encoded = np.asarray(self.encoder([documents[position] for position in changed_positions]),
+                                     dtype=np.float32)
+
+            dimension = encoded.shape[1] if encoded is not None else self.vectors.shape[1]
+            vectors = np.empty((len(insurances), dimension), dtype=np.float32)
+            if reuse_rows:
+                vectors[reuse_positions] = self.vectors[reuse_rows]
+            if encoded is not None:
+                vectors[changed_positions] = encoded
+
+            self._state = (vectors, product_ids, stamps)
+            self.encoded_total += len(changed_positions)
+            self.reused_total += len(reuse_rows)
+            print(f"Embedding index synced: {len(changed_positions)} encoded, {len(reuse_rows)} reused")
+
+            if self.path:
+                try:
+                    self.save(self.path)
+                except Exception as e:
+                    print(f"Error saving embedding index to {self.path}: {e}")
+
+    def similarities(self, text: str, vectors: Optional[np.ndarray] = None) -> np.ndarray:
+        query = np.asarray(self.encoder([text]), dtype=np.float32)[0]
+        return (self.vectors if vectors is None else vectors) @ query
+
+    def top_k(self, text: str, k: int, product_ids: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        Позиции k ближайших по косинусу продуктов, по убыванию близости. Если передан
+        product_ids каталога, а индекс построен по другому набору продуктов, возвращается None.
+        """
+        vectors, indexed_ids, _ = self._state
+        if product_ids is not None and not np.array_equal(indexed_ids, product_ids):
+            return None
+        similarities = self.similarities(text, vectors)
+        if k >= len(similarities):
+            return np.argsort(-similarities, kind='stable')
+        top = np.argpartition(-similarities, k)[:k]
+        return top[np.argsort(-similarities[top], kind='stable')]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "products": len(self),
+            "dimension": int(self.vectors.shape[1]) if self.vectors.ndim == 2 else 0,
+            "memory_mapped": isinstance(self.vectors, np.memmap),
+            "encoded_total": self.encoded_total,
+            "reused_total": self.reused_total,
+        }
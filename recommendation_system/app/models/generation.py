@@ -0,0 +1,50 @@
+from typing import List, Sequence
+
+import torch
+from transformers import LogitsProcessor, StoppingCriteria
+
+# _clean_generated_text оставляет текст до первой точки — дальше генерировать незачем
+SENTENCE_TERMINATORS = ('.',)
+
+
+def sentence_end_token_ids(tokenizer, terminators: Sequence[str] = SENTENCE_TERMINATORS) -> List[int]:
+    """Id всех токенов словаря, содержащих символ конца предложения"""
+    return sorted(token_id for token, token_id in tokenizer.get_vocab().items()
+                  if any(terminator in token for terminator in terminators))
+
+
+def _sentence_ended(input_ids: torch.Tensor, prompt_length: int, end_token_ids: torch.Tensor) -> torch.Tensor:
+    generated = input_ids[:, prompt_length:]
+    if generated.shape[1] == 0:
+        return torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+    return torch.isin(generated, end_token_ids).any(dim=1)
+
+
+class SentenceEndLogitsProcessor(LogitsProcessor):
+    """
+    После токена конца предложения последовательности разрешён только eos:
+    в батче она завершается сама, остальные продолжают генерацию.
+    """
+
+    def __init__(self, prompt_length: int, end_token_ids: torch.Tensor, eos_token_id: int):
+        self.prompt_length = prompt_length
+        self.end_token_ids = end_token_ids
+        self.eos_token_id = eos_token_id
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        ended = _sentence_ended(input_ids, self.prompt_length, self.end_token_ids)
+        if ended.any():
+            scores[ended] = float('-inf')
+            scores[ended, self.eos_token_id] = 0.0
+        return scores
+
+
+class SentenceStoppingCriteria(StoppingCriteria):
+    """Останавливает генерацию, как только каждая последовательность батча закончила первое предложение."""
+
+    def __init__(self, prompt_length: int, end_token_ids: torch.Tensor):
+        self.prompt_length = prompt_length
+        self.end_token_ids = end_token_ids
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> bool:
+        return bool(_sentence_ended(input_ids, self.prompt_length, self.end_token_ids).all())
@@ -15,7 +15,7 @@ class InsuranceRecommendationRequest(BaseModel):
     travel_frequency: str
 
 
-class InsuranceRecommendation(BaseModel):
+class RankedInsurance(BaseModel):
     product_id: int
     product_name: str
     provider: str
@@ -26,6 +26,17 @@ class InsuranceRecommendation(BaseModel):
     duration: Optional[int] = None
     estimated_price: float
     match_score: float = Field(..., ge=0.0, le=1.0)
+
+
+class InsuranceRecommendation(RankedInsurance):
+    recommendation_reason: str
+    features: List[str] = []
+    suitable_for: List[str] = []
+    risks_covered: List[str] = []
+
+
+class InsuranceEnrichment(BaseModel):
+    product_id: int
     recommendation_reason: str
     features: List[str] = []
     suitable_for: List[str] = []
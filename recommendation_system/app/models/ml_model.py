@@ -1,98 +1,361 @@
 import os
+import threading
 import torch
-import random
-from typing import List, Dict, Any
+import numpy as np
+from datetime import timedelta
+from typing import Iterator, List, Dict, Any, Optional, Set, Tuple
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline, LogitsProcessorList, StoppingCriteriaList
+from app.models.content_cache import CategoryContentCache, CategoryContent
+from app.models.content_store import ProductContentStore
+from app.models.scoring import ScoringIndex
+from app.models.catalog import CatalogSnapshot, normalize_row
+from app.models.embedding_index import EmbeddingIndex, load_sentence_encoder
+from app.models.seeding import profile_seed, seeded_uniform
+from app.models.precision import apply_precision
+from app.models.pricing import pricing_engine
+from app.models.selection import select_top_k
+from app.models.generation import SentenceEndLogitsProcessor, SentenceStoppingCriteria, sentence_end_token_ids
 
 database_url = os.environ.get('DATABASE_URL')
+GENERATION_BATCH_SIZE = int(os.environ.get('GENERATION_BATCH_SIZE', '32'))
+CONTENT_CACHE_SIZE = int(os.environ.get('CONTENT_CACHE_SIZE', '256'))
+CONTENT_CACHE_TTL = float(os.environ.get('CONTENT_CACHE_TTL', '3600'))
+EMBEDDING_RETRIEVAL = os.environ.get('EMBEDDING_RETRIEVAL', 'false').lower() == 'true'
+RETRIEVAL_TOP_K = int(os.environ.get('RETRIEVAL_TOP_K', '200'))
+# Детерминированный режим: шум скоринга и цены берётся из зерна (хэш профиля + product_id),
+# генерация — жадная. Один и тот же профиль всегда получает побайтно одинаковый ответ.
+DETERMINISTIC_MODE = os.environ.get('DETERMINISTIC_MODE', 'false').lower() == 'true'
+STOP_ON_SENTENCE = os.environ.get('STOP_ON_SENTENCE', 'true').lower() == 'true'
+RECOMMENDATIONS_TOP_N = int(os.environ.get('RECOMMENDATIONS_TOP_N', '10'))
+# Не больше CATEGORY_CAP продуктов одной категории в выдаче (0 — без ограничения)
+CATEGORY_CAP = int(os.environ.get('CATEGORY_CAP', '0'))
+# Вес разнообразия при отборе (MMR): 1.0 — сначала по продукту каждой категории, 0.0 — только по оценке
+SELECTION_DIVERSITY = float(os.environ.get('SELECTION_DIVERSITY', '1.0'))
+
+# Запас при выборке изменённых строк по updated_at: транзакция с более ранней
+# отметкой времени может зафиксироваться позже уже прочитанных строк
+CATALOG_WATERMARK_OVERLAP = float(os.environ.get('CATALOG_WATERMARK_OVERLAP', '5'))
+
+SCORE_NOISE_STREAM = 1
+PRICE_NOISE_STREAM = 2
 
 
 class InsuranceRecommenderModel:
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, precision: str = 'fp32', lazy: bool = False):
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.insurances = []
+        self.precision = 'fp32'
+        self._catalog = CatalogSnapshot([])
+        self._catalog_refreshing = False
+        # Полная загрузка и инкрементальное обновление не пересекаются: каждое строит
+        # снимок от текущего, и более старый не может быть установлен последним
+        self._catalog_lock = threading.RLock()
+        self.batch_scheduler = None
+        self._sentence_end_ids = None
+        self.generate_calls = 0
+        self.decoded_tokens = 0
+        self._generation_stats_lock = threading.Lock()
+        self.embedding_index = None
+        self._embedding_catalog = None
+        # Тексты int8/bf16 отличаются от fp32, поэтому кэш контента разделяется по точности;
+        # версия уточняется в load_model по фактически загруженной точности
+        self.content_cache = CategoryContentCache(f"{model_path}:{self.precision}", CONTENT_CACHE_SIZE,
+                                                  CONTENT_CACHE_TTL)
+        self.content_store = ProductContentStore.load()
+        self.pricing = pricing_engine
+
+        self.model_path = model_path
+        self.requested_precision = precision
+        self.tokenizer = None
+        self.model = None
+
+        # lazy=True: этапы загрузки запускает сервис (см. RecommendationService.load)
+        if not lazy:
+            try:
+                self._load_data_from_database()
+            except Exception as e:
+                print(f"Error loading data from database: {e}")
+                self.insurances = []
 
-        try:
-            self._load_data_from_database()
-        except Exception as e:
-            print(f"Error loading data from database: {e}")
-            self.insurances = []
+            self.load_model()
+            self.build_indexes()
 
+    def load_model(self):
         try:
-            print(f"Loading DialoGPT model from {model_path}...")
+            print(f"Loading DialoGPT model from {self.model_path}...")
 
             print("Loading tokenizer... ", end="", flush=True)
             self.tokenizer = AutoTokenizer.from_pretrained(
-                model_path,
+                self.model_path,
                 padding_side='left',
                 use_fast=True
             )
 
             print("Loading model... ", end="", flush=True)
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_path,
+            model = AutoModelForCausalLM.from_pretrained(
+                self.model_path,
                 device_map=self.device,
                 low_cpu_mem_usage=True
             )
+            model, self.precision = apply_precision(model, self.requested_precision, self.device)
+            # Если запрошенная точность недоступна, контент генерируется в той, что загружена
+            self.content_cache.set_model_version(f"{self.model_path}:{self.precision}")
 
             if self.tokenizer.pad_token is None:
                 self.tokenizer.pad_token = self.tokenizer.eos_token
 
-            print("DialoGPT model successfully loaded!")
+            self._sentence_end_ids = torch.tensor(sentence_end_token_ids(self.tokenizer), device=self.device)
+            self.model = model
+
+            print(f"DialoGPT model successfully loaded ({self.precision})!")
         except Exception as e:
             print(f"Error loading DialoGPT model: {e}")
             raise
 
+    def build_indexes(self):
+        if EMBEDDING_RETRIEVAL:
+            try:
+                self.embedding_index = EmbeddingIndex(load_sentence_encoder(device=str(self.device)))
+                self._get_embedding_index()
+            except Exception as e:
+                print(f"Error loading embedding index, falling back to token scoring only: {e}")
+                self.embedding_index = None
+
+        try:
+            self._warm_content_cache()
+        except Exception as e:
+            print(f"Error warming up content cache: {e}")
+
+    @property
+    def insurances(self) -> List[Dict[str, Any]]:
+        # Словари собираются из колонок снимка; на пути запроса используется сам снимок
+        return list(self._catalog.rows())
+
+    @insurances.setter
+    def insurances(self, insurances: List[Dict[str, Any]]) -> None:
+        self._catalog = CatalogSnapshot(insurances)
+
+    @property
+    def catalog_version(self) -> Optional[str]:
+        return self._catalog.version
+
+    @catalog_version.setter
+    def catalog_version(self, catalog_version: Optional[str]) -> None:
+        self._catalog.version = catalog_version
+
+    def catalog_stats(self) -> Dict[str, Any]:
+        return self._catalog.stats()
+
+    @staticmethod
+    def _watermark(insurances: List[Dict[str, Any]], current: Any = None) -> Any:
+        stamps = [insurance['updated_at'] for insurance in insurances if insurance.get('updated_at') is not None]
+        if current is not None:
+            stamps.append(current)
+        return max(stamps) if stamps else None
+
+    def _install_catalog(self, snapshot: CatalogSnapshot) -> None:
+        """Индексы нового снимка строятся до подмены, запросы продолжают работать со старым"""
+        with self._catalog_lock:
+            self._catalog_refreshing = True
+            try:
+                snapshot.scoring_index(self._format_insurance_info)
+                if self.embedding_index is not None:
+                    self._sync_embedding_index(snapshot)
+                self._catalog = snapshot
+            finally:
+                self._catalog_refreshing = False
+
     def _load_data_from_database(self):
+        with self._catalog_lock:
+            self._load_catalog()
+
+    def _load_catalog(self):
         try:
             conn = psycopg2.connect(database_url)
+            # Каталог и его версия читаются из одного снимка базы
+            conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
 
             with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                 with open('app/sql/get_insurances.sql', 'r') as sql_file:
                     sql_query = sql_file.read()
 
                 cursor.execute(sql_query)
-                self.insurances = cursor.fetchall()
-                print(f"Loaded {len(self.insurances)} insurance policies from database")
+                insurances = cursor.fetchall()
+                catalog_version = self._fetch_catalog_version(cursor)
 
             conn.close()
+
+            self._install_catalog(CatalogSnapshot(insurances, catalog_version, self._watermark(insurances)))
+            print(f"Loaded {len(insurances)} insurance policies from database (catalog {catalog_version})")
         except Exception as e:
             print(f"Error connecting to database: {e}")
             raise
 
-    def _generate_text(self, prompt: str, max_length: int = 100) -> str:
+    def apply_catalog_changes(self, product_ids: Set[int], category_ids: Set[int]) -> int:
+        """
+        Инкрементальное обновление каталога: перечитываются строки с updated_at новее
+        отметки прошлой загрузки и строки из уведомлений; продукты из уведомлений,
+        которых больше нет в базе, удаляются. Возвращает число изменённых продуктов.
+        """
+        with self._catalog_lock:
+            return self._apply_catalog_changes(product_ids, category_ids)
+
+    def _apply_catalog_changes(self, product_ids: Set[int], category_ids: Set[int]) -> int:
+        catalog = self._catalog
+        if catalog.watermark is None:
+            self._load_data_from_database()
+            return len(self._catalog)
+
+        since = catalog.watermark - timedelta(seconds=CATALOG_WATERMARK_OVERLAP)
+        conn = psycopg2.connect(database_url)
+        try:
+            conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                with open('app/sql/get_insurances_changed.sql', 'r') as sql_file:
+                    cursor.execute(sql_file.read(), {
+                        'since': since,
+                        'product_ids': sorted(product_ids),
+                        'category_ids': sorted(category_ids),
+                    })
+                rows = cursor.fetchall()
+                catalog_version = self._fetch_catalog_version(cursor)
+        finally:
+            conn.close()
+
+        if catalog_version == catalog.version:
+            return 0
+
+        by_id = {insurance['product_id']: insurance for insurance in catalog.rows()}
+        rows = [normalize_row(row) for row in rows]
+        changed = 0
+        for row in rows:
+            if by_id.get(row['product_id']) != row:
+                changed += 1
+            by_id[row['product_id']] = row
+
+        returned = {row['product_id'] for row in rows}
+        for product_id in product_ids - returned:
+            if by_id.pop(product_id, None) is not None:
+                changed += 1
+
+        insurances = [by_id[product_id] for product_id in sorted(by_id)]
+        self._install_catalog(CatalogSnapshot(insurances, catalog_version,
+                                              self._watermark(rows, catalog.watermark)))
+        print(f"Catalog updated incrementally: {changed} products changed (catalog {catalog_version})")
+        return changed
+
+    @staticmethod
+    def _fetch_catalog_version(cursor) -> str:
+        with open('app/sql/get_catalog_version.sql', 'r') as sql_file:
+            cursor.execute(sql_file.read())
+        return cursor.fetchone()['catalog_version']
+
+    def refresh_catalog_if_changed(self) -> bool:
+        """Перечитывает каталог, если insurance_products или insurance_categories изменились"""
         try:
-            inputs = self.tokenizer.encode(prompt, return_tensors="pt", truncation=True, max_length=512)
+            conn = psycopg2.connect(database_url)
+            try:
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    catalog_version = self._fetch_catalog_version(cursor)
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Error checking catalog version: {e}")
+            return False
+
+        with self._catalog_lock:
+            # Пока ждали блокировку, каталог мог обновить подписчик
+            if catalog_version == self.catalog_version:
+                return False
+
+            print(f"Catalog changed ({self.catalog_version} -> {catalog_version}), reloading")
+            try:
+                self._load_catalog()
+            except Exception as e:
+                # Запросы продолжают обслуживаться прежним снимком; следующая проверка повторит загрузку
+                print(f"Error reloading catalog, keeping version {self.catalog_version}: {e}")
+                return False
+        return True
+
+    def _generate_texts(self, prompts: List[str], max_length: int = 100) -> List[str]:
+        # Если подключён планировщик, промпты объединяются в батчи с промптами других запросов.
+        if self.batch_scheduler is not None:
+            return self.batch_scheduler.submit(prompts, max_length)
+
+        results = []
+        for start in range(0, len(prompts), GENERATION_BATCH_SIZE):
+            results.extend(self._generate_batch(prompts[start:start + GENERATION_BATCH_SIZE], max_length))
+        return results
+
+    def _generate_batch(self, prompts: List[str], max_length: int) -> List[str]:
+        try:
+            # padding_side='left' у токенизатора: все промпты заканчиваются в одной позиции,
+            # поэтому новые токены каждой последовательности начинаются с prompt_length.
+            inputs = self.tokenizer(prompts, return_tensors="pt", padding=True, truncation=True, max_length=512)
             inputs = inputs.to(self.device)
+            prompt_length = inputs["input_ids"].shape[1]
+
+            sampling = {"do_sample": False} if DETERMINISTIC_MODE else {"do_sample": True, "temperature": 0.7}
+
+            # Последовательность заканчивается на первом конце предложения: дальше
+            # _clean_generated_text всё равно всё отбрасывает.
+            stopping = {}
+            if STOP_ON_SENTENCE and self._sentence_end_ids is not None:
+                stopping = {
+                    "logits_processor": LogitsProcessorList([SentenceEndLogitsProcessor(
+                        prompt_length, self._sentence_end_ids, self.tokenizer.eos_token_id
+                    )]),
+                    "stopping_criteria": StoppingCriteriaList([SentenceStoppingCriteria(
+                        prompt_length, self._sentence_end_ids
+                    )]),
+                }
 
             with torch.no_grad():
                 outputs = self.model.generate(
-                    inputs,
-                    max_length=inputs.shape[1] + max_length,
+                    **inputs,
+                    max_new_tokens=max_length,
                     num_return_sequences=1,
-                    temperature=0.7,
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.eos_token_id,
+                    pad_token_id=self.tokenizer.pad_token_id,
                     eos_token_id=self.tokenizer.eos_token_id,
-                    repetition_penalty=1.2
+                    repetition_penalty=1.2,
+                    **sampling,
+                    **stopping
                 )
 
-            generated_text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            response = generated_text[len(prompt):].strip()
-
-            if not response:
-                return "Подходящий продукт для ваших потребностей"
-
-            sentences = response.split('.')
-            clean_response = sentences[0].strip() if sentences else response
+            with self._generation_stats_lock:
+                self.generate_calls += 1
+                self.decoded_tokens += outputs.shape[0] * (outputs.shape[1] - prompt_length)
 
-            return clean_response[:200] if len(clean_response) > 200 else clean_response
+            generated = self.tokenizer.batch_decode(outputs[:, prompt_length:], skip_special_tokens=True)
+            return [self._clean_generated_text(text) for text in generated]
 
         except Exception as e:
             print(f"Error generating text: {e}")
-            return "Рекомендуемый страховой продукт"
+            return ["Рекомендуемый страховой продукт"] * len(prompts)
+
+    def generation_stats(self) -> Dict[str, Any]:
+        with self._generation_stats_lock:
+            return {
+                "precision": self.precision,
+                "pid": os.getpid(),
+                "torch_threads": torch.get_num_threads(),
+                "stop_on_sentence": STOP_ON_SENTENCE,
+                "generate_calls": self.generate_calls,
+                "decoded_tokens": self.decoded_tokens,
+            }
+
+    @staticmethod
+    def _clean_generated_text(text: str) -> str:
+        response = text.strip()
+
+        if not response:
+            return "Подходящий продукт для ваших потребностей"
+
+        sentences = response.split('.')
+        clean_response = sentences[0].strip() if sentences else response
+
+        return clean_response[:200] if len(clean_response) > 200 else clean_response
 
     def _format_user_profile(self, user_data: Dict[str, Any]) -> str:
         profile = f"Пользователь {user_data['age']} лет, {user_data['gender']}, работает в сфере {user_data['occupation']}. "
@@ -137,139 +400,273 @@ class InsuranceRecommenderModel:
 
         return info
 
-    def _calculate_similarity_score(self, user_profile: str, insurance_info: str) -> float:
-        user_tokens = set(user_profile.lower().split())
-        insurance_tokens = set(insurance_info.lower().split())
-
-        intersection = len(user_tokens.intersection(insurance_tokens))
-        union = len(user_tokens.union(insurance_tokens))
-
-        if union == 0:
-            return 0.3
-
-        base_score = intersection / union
-        category_bonus = 0.0
-
-        if any(word in insurance_info.lower() for word in ['медицинское', 'здоровье']):
-            category_bonus += 0.1
-        if any(word in insurance_info.lower() for word in ['авто', 'транспорт']):
-            category_bonus += 0.05
-        if any(word in insurance_info.lower() for word in ['недвижимость', 'дом']):
-            category_bonus += 0.05
-
-        final_score = min(0.95, base_score + category_bonus + random.uniform(0.1, 0.3))
-        return max(0.3, final_score)
-
-    def _generate_recommendation_reason(self, user_data: Dict[str, Any], insurance: Dict[str, Any]) -> str:
-        prompt = f"Объясни почему страховой продукт {insurance['product_name']} категории {insurance['category_name']} подходит пользователю {user_data['age']} лет с доходом {user_data['income']} рублей:"
-        return self._generate_text(prompt, max_length=80)
-
-    def _generate_features(self, insurance: Dict[str, Any]) -> List[str]:
-        features = []
-        for i in range(4):
-            prompt = f"Назови одну ключевую особенность страхового продукта {insurance['category_name']} номер {i + 1}:"
-            feature = self._generate_text(prompt, max_length=30)
-            if feature and len(feature) > 5:
-                features.append(feature)
-        return features
-
-    def _generate_suitable_for(self, insurance: Dict[str, Any]) -> List[str]:
-        suitable = []
-        for i in range(3):
-            prompt = f"Для кого подходит {insurance['category_name']} вариант {i + 1}:"
-            target = self._generate_text(prompt, max_length=25)
-            if target and len(target) > 5:
-                suitable.append(target)
-        return suitable
-
-    def _generate_risks_covered(self, insurance: Dict[str, Any]) -> List[str]:
-        risks = []
-        for i in range(5):
-            prompt = f"Какой риск покрывает {insurance['category_name']} пункт {i + 1}:"
-            risk = self._generate_text(prompt, max_length=25)
-            if risk and len(risk) > 5:
-                risks.append(risk)
-        return risks
-
-    def _estimate_price(self, user_data: Dict[str, Any], insurance: Dict[str, Any]) -> float:
-        base_price = float(insurance['premium'])
-
-        age_factor = 1.0
-        if user_data['age'] < 25:
-            age_factor = 1.3
-        elif user_data['age'] > 65:
-            age_factor = 1.4
-        elif user_data['age'] > 50:
-            age_factor = 1.2
-
-        income_factor = 1.0
-        if user_data['income'] > 2000000:
-            income_factor = 0.9
-        elif user_data['income'] > 1000000:
-            income_factor = 0.95
-
-        risk_factor = 1.0
-        if user_data['has_medical_conditions'] and insurance['category_name'] == 'Медицинское страхование':
-            risk_factor *= 1.3
-        if user_data['has_children']:
-            risk_factor *= 1.1
-
-        random_factor = 1.0 + (random.random() * 0.1 - 0.05)
-        estimated_price = base_price * age_factor * income_factor * risk_factor * random_factor
-
-        return min(base_price * 2.0, max(base_price * 0.7, estimated_price))
-
-    def get_recommendations(self, user_data: Dict[str, Any], top_n: int = 10) -> List[Dict[str, Any]]:
-        if not self.insurances:
-            print("Warning: Insurance list is empty, trying to update from database")
-            self._load_data_from_database()
-
-            if not self.insurances:
-                return []
-
-        user_profile = self._format_user_profile(user_data)
-        recommendations = []
-
-        for insurance in self.insurances:
+    def _get_scoring_index(self, catalog: Optional[CatalogSnapshot] = None) -> ScoringIndex:
+        return (catalog or self._catalog).scoring_index(self._format_insurance_info)
+
+    def _get_embedding_index(self, catalog: Optional[CatalogSnapshot] = None) -> Optional[EmbeddingIndex]:
+        catalog = catalog or self._catalog
+        if self.embedding_index is not None and self._embedding_catalog is not catalog:
+            # Индекс синхронизируется только с текущим снимком; запрос, начатый до
+            # подмены снимка, ранжируется без отбора по эмбеддингам.
+            if self._catalog_refreshing or catalog is not self._catalog:
+                return None
+            self._sync_embedding_index(catalog)
+        return self.embedding_index
+
+    def _sync_embedding_index(self, catalog: CatalogSnapshot) -> None:
+        insurances = list(catalog.rows())
+        self.embedding_index.sync(insurances, [self._format_insurance_info(insurance) for insurance in insurances])
+        self._embedding_catalog = catalog
+
+    def _recommendation_reason_prompt(self, user_data: Dict[str, Any], insurance: Dict[str, Any]) -> str:
+        return f"Объясни почему страховой продукт {insurance['product_name']} категории {insurance['category_name']} подходит пользователю {user_data['age']} лет с доходом {user_data['income']} рублей:"
+
+    def _features_prompts(self, insurance: Dict[str, Any]) -> List[str]:
+        return [f"Назови одну ключевую особенность страхового продукта {insurance['category_name']} номер {i + 1}:"
+                for i in range(4)]
+
+    def _suitable_for_prompts(self, insurance: Dict[str, Any]) -> List[str]:
+        return [f"Для кого подходит {insurance['category_name']} вариант {i + 1}:" for i in range(3)]
+
+    def _risks_covered_prompts(self, insurance: Dict[str, Any]) -> List[str]:
+        return [f"Какой риск покрывает {insurance['category_name']} пункт {i + 1}:" for i in range(5)]
+
+    @staticmethod
+    def _collect_items(texts: List[str]) -> List[str]:
+        return [text for text in texts if text and len(text) > 5]
+
+    def _run_prompt_jobs(self, jobs: List[Tuple[int, str]]) -> List[str]:
+        """Выполняет пары (max_length, prompt) батчами: один generate на каждую длину генерации."""
+        results = [""] * len(jobs)
+        by_length: Dict[int, List[int]] = {}
+        for index, (max_length, _) in enumerate(jobs):
+            by_length.setdefault(max_length, []).append(index)
+
+        for max_length, indexes in by_length.items():
+            texts = self._generate_texts([jobs[index][1] for index in indexes], max_length)
+            for index, text in zip(indexes, texts):
+                results[index] = text
+
+        return results
+
+    def estimate_prices(self, profiles: List[Dict[str, Any]], positions: Optional[np.ndarray] = None,
+                        seeds: Optional[List[Optional[int]]] = None,
+                        catalog: Optional[CatalogSnapshot] = None) -> np.ndarray:
+        """
+        estimated_price для каждого профиля и каждого продукта снимка (или только
+        продуктов positions): матрица len(profiles) × число продуктов.
+        """
+        catalog = catalog or self._catalog
+        if positions is None:
+            positions = np.arange(len(catalog))
+        positions = np.asarray(positions, dtype=np.int64)
+        product_ids = catalog.product_ids[positions]
+
+        units = np.empty((len(profiles), len(positions)), dtype=np.float64)
+        for row, seed in enumerate(seeds or [None] * len(profiles)):
+            if seed is None:
+                units[row] = np.random.random(len(positions))
+            else:
+                units[row] = seeded_uniform(seed, product_ids, stream=PRICE_NOISE_STREAM)
+
+        return self.pricing.estimate(profiles, catalog.premium[positions], catalog.category_ids[positions],
+                                     catalog.category_names, units)
+
+    def _rank_candidates(self, user_profile: str, seed: Optional[int] = None,
+                         catalog: Optional[CatalogSnapshot] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Позиции продуктов снимка с оценкой выше 0.3 (по возрастанию позиции) и их оценки"""
+        catalog = catalog or self._catalog
+        index = self._get_scoring_index(catalog)
+        if seed is None:
+            noise = np.random.uniform(0.1, 0.3, len(index))
+        else:
+            noise = seeded_uniform(seed, catalog.product_ids, 0.1, 0.3, stream=SCORE_NOISE_STREAM)
+        scores = index.score(user_profile, noise)
+
+        # Этап отбора по эмбеддингам: ранжируются только RETRIEVAL_TOP_K ближайших по косинусу продуктов.
+        # Позиции берутся из того же состояния индекса, по которому сверяется набор продуктов снимка.
+        embedding_index = self._get_embedding_index(catalog)
+        top = None if embedding_index is None else embedding_index.top_k(user_profile, RETRIEVAL_TOP_K,
+                                                                         catalog.product_ids)
+        if top is not None:
+            retrieved = np.zeros(len(index), dtype=bool)
+            retrieved[top] = True
+            scores = np.where(retrieved, scores, 0.0)
+
+        positions = np.flatnonzero(scores > 0.3)
+        return positions, scores[positions]
+
+    def _select_diverse(self, catalog: CatalogSnapshot, positions: np.ndarray, scores: np.ndarray,
+                        top_n: int) -> List[Tuple[float, int]]:
+        picks = select_top_k(scores, catalog.category_ids[positions], top_n,
+                             CATEGORY_CAP or None, SELECTION_DIVERSITY)
+        return [(float(scores[pick]), int(positions[pick])) for pick in picks]
+
+    def _category_prompt_specs(self, insurance: Dict[str, Any]) -> List[Tuple[str, int, List[str]]]:
+        return [
+            ('features', 30, self._features_prompts(insurance)),
+            ('suitable_for', 25, self._suitable_for_prompts(insurance)),
+            ('risks_covered', 25, self._risks_covered_prompts(insurance)),
+        ]
+
+    @staticmethod
+    def _append_jobs(jobs: List[Tuple[int, str]], specs: List[Tuple[str, int, List[str]]]) -> Dict[str, slice]:
+        slots = {}
+        for field, max_length, prompts in specs:
+            slots[field] = slice(len(jobs), len(jobs) + len(prompts))
+            jobs.extend((max_length, prompt) for prompt in prompts)
+        return slots
+
+    def _store_category_contents(self, category_slots: Dict[str, Dict[str, slice]],
+                                 texts: List[str]) -> Dict[str, CategoryContent]:
+        contents = {}
+        for category, slots in category_slots.items():
+            content = {field: self._collect_items(texts[field_slice]) for field, field_slice in slots.items()}
+            self.content_cache.put(category, content)
+            contents[category] = content
+        return contents
+
+    def _warm_content_cache(self):
+        jobs: List[Tuple[int, str]] = []
+        category_slots: Dict[str, Dict[str, slice]] = {}
+
+        for insurance in self._catalog.rows():
+            category = insurance['category_name']
+            if insurance in self.content_store:
+                continue
+            if category not in category_slots and category not in self.content_cache:
+                category_slots[category] = self._append_jobs(jobs, self._category_prompt_specs(insurance))
+
+        if jobs:
+            self._store_category_contents(category_slots, self._run_prompt_jobs(jobs))
+            print(f"Content cache warmed up for {len(category_slots)} categories")
+
+    def _ranked_products(self, user_data: Dict[str, Any], selected: List[Tuple[float, int]],
+                         seed: Optional[int] = None,
+                         catalog: Optional[CatalogSnapshot] = None) -> List[Dict[str, Any]]:
+        """Продукты выдачи с оценкой и ценой, ещё без сгенерированных текстов"""
+        catalog = catalog or self._catalog
+        prices = self.estimate_prices([user_data], [position for _, position in selected], [seed], catalog)[0]
+        products = []
+        for (match_score, position), price in zip(selected, prices.tolist()):
+            product = catalog.row(position)
+            product['match_score'] = match_score
+            product['estimated_price'] = price
+            products.append(product)
+        return products
+
+    def _iter_enrichments(self, user_data: Dict[str, Any],
+                          products: List[Dict[str, Any]]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Сгенерированные поля продуктов (номер продукта, поля) по мере готовности.
+        features/suitable_for/risks_covered берутся из предрассчитанного хранилища, затем
+        из кэша по категории: такие продукты готовы после одного батча причин рекомендаций.
+        Для остальных затем генерируется контент их категорий. Число вызовов generate
+        то же, что при одном общем батче: у причин и контента разные max_length.
+        """
+        product_contents: List[Optional[CategoryContent]] = []
+        contents: Dict[str, CategoryContent] = {}
+        category_specs: Dict[str, List[Tuple[str, int, List[str]]]] = {}
+
+        for insurance in products:
+            content = self.content_store.lookup(insurance)
+            product_contents.append(content)
+
+            category = insurance['category_name']
+            if content is None and category not in contents and category not in category_specs:
+                cached = self.content_cache.get(category)
+                if cached is not None:
+                    contents[category] = cached
+                else:
+                    category_specs[category] = self._category_prompt_specs(insurance)
+
+        reasons = self._run_prompt_jobs([(80, self._recommendation_reason_prompt(user_data, insurance))
+                                         for insurance in products])
+
+        def enrichment(index: int) -> Optional[Dict[str, Any]]:
+            insurance = products[index]
             try:
-                insurance_info = self._format_insurance_info(insurance)
-                match_score = self._calculate_similarity_score(user_profile, insurance_info)
-
-                if match_score > 0.3:
-                    recommendation_reason = self._generate_recommendation_reason(user_data, insurance)
-                    estimated_price = self._estimate_price(user_data, insurance)
-                    features = self._generate_features(insurance)
-                    suitable_for = self._generate_suitable_for(insurance)
-                    risks_covered = self._generate_risks_covered(insurance)
-
-                    recommendation = dict(insurance)
-                    recommendation['match_score'] = match_score
-                    recommendation['estimated_price'] = estimated_price
-                    recommendation['recommendation_reason'] = recommendation_reason
-                    recommendation['features'] = features
-                    recommendation['suitable_for'] = suitable_for
-                    recommendation['risks_covered'] = risks_covered
-
-                    recommendations.append(recommendation)
+                content = product_contents[index] or contents[insurance['category_name']]
+                return {
+                    'recommendation_reason': reasons[index],
+                    'features': list(content['features']),
+                    'suitable_for': list(content['suitable_for']),
+                    'risks_covered': list(content['risks_covered']),
+                }
             except Exception as e:
                 print(f"Error processing insurance {insurance.get('product_id', 'unknown')}: {e}")
-                continue
+                return None
 
-        recommendations = sorted(recommendations, key=lambda x: x["match_score"], reverse=True)
+        pending = []
+        for index, insurance in enumerate(products):
+            if product_contents[index] is None and insurance['category_name'] in category_specs:
+                pending.append(index)
+                continue
+            fields = enrichment(index)
+            if fields is not None:
+                yield index, fields
+
+        if not pending:
+            return
+
+        jobs: List[Tuple[int, str]] = []
+        category_slots = {category: self._append_jobs(jobs, specs) for category, specs in category_specs.items()}
+        contents.update(self._store_category_contents(category_slots, self._run_prompt_jobs(jobs)))
+
+        for index in pending:
+            fields = enrichment(index)
+            if fields is not None:
+                yield index, fields
+
+    def _enrich_recommendations(self, user_data: Dict[str, Any], selected: List[Tuple[float, int]],
+                                seed: Optional[int] = None,
+                                catalog: Optional[CatalogSnapshot] = None) -> List[Dict[str, Any]]:
+        products = self._ranked_products(user_data, selected, seed, catalog)
+        enriched = set()
+        for index, fields in self._iter_enrichments(user_data, products):
+            products[index].update(fields)
+            enriched.add(index)
+        return [product for index, product in enumerate(products) if index in enriched]
+
+    def _select_recommendations(self, user_data: Dict[str, Any], top_n: Optional[int] = None
+                                ) -> Tuple[CatalogSnapshot, List[Tuple[float, int]], Optional[int]]:
+        if not self._catalog:
+            print("Warning: Insurance list is empty, trying to update from database")
+            self._load_data_from_database()
 
-        final_recommendations = []
-        categories_added = set()
+        # Этап 1: дешёвое ранжирование всего каталога и отбор top_n с разнообразием категорий.
+        catalog = self._catalog
+        if not catalog:
+            return catalog, [], None
+        top_n = RECOMMENDATIONS_TOP_N if top_n is None else top_n
+        seed = profile_seed(user_data) if DETERMINISTIC_MODE else None
+        user_profile = self._format_user_profile(user_data)
+        positions, scores = self._rank_candidates(user_profile, seed, catalog)
+        return catalog, self._select_diverse(catalog, positions, scores, top_n), seed
 
-        for rec in recommendations:
-            category = rec["category_name"]
-            if category not in categories_added and len(final_recommendations) < top_n:
-                final_recommendations.append(rec)
-                categories_added.add(category)
+    def get_recommendations(self, user_data: Dict[str, Any], top_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        catalog, selected, seed = self._select_recommendations(user_data, top_n)
 
-        remaining_slots = top_n - len(final_recommendations)
-        if remaining_slots > 0:
-            remaining_recs = [r for r in recommendations if r not in final_recommendations]
-            final_recommendations.extend(remaining_recs[:remaining_slots])
+        # Этап 2: генерация текста (DialoGPT) только для продуктов, попавших в выдачу.
+        final_recommendations = self._enrich_recommendations(user_data, selected, seed, catalog)
 
         print(f"Generated {len(final_recommendations)} recommendations")
         return final_recommendations
+
+    def stream_recommendations(self, user_data: Dict[str, Any],
+                               top_n: Optional[int] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Те же рекомендации по частям: событие ("ranked", продукты с оценкой и ценой)
+        сразу после ранжирования, затем ("product", сгенерированные поля с product_id)
+        для каждого продукта по мере готовности.
+        """
+        catalog, selected, seed = self._select_recommendations(user_data, top_n)
+        products = self._ranked_products(user_data, selected, seed, catalog)
+        yield 'ranked', [dict(product) for product in products]
+
+        enriched = 0
+        for index, fields in self._iter_enrichments(user_data, products):
+            enriched += 1
+            yield 'product', {'product_id': products[index]['product_id'], **fields}
+
+        print(f"Streamed {enriched} recommendations")
@@ -0,0 +1,60 @@
+from typing import Tuple
+
+import torch
+
+PRECISIONS = ('fp32', 'bf16', 'int8')
+
+
+def cpu_supports_bf16() -> bool:
+    """Аппаратная поддержка bfloat16 (AVX512-BF16 или AMX); без неё bf16 на CPU медленнее fp32"""
+    try:
+        with open('/proc/cpuinfo', 'r') as cpuinfo:
+            flags = cpuinfo.read()
+    except OSError:
+        return False
+    return 'avx512_bf16' in flags or 'amx_bf16' in flags
+
+
+def _conv1d_to_linear(model: torch.nn.Module) -> None:
+    """
+    GPT-2 (и DialoGPT) хранит проекции внимания и MLP в transformers Conv1D, а
+    quantize_dynamic квантует только nn.Linear. Conv1D — тот же Linear с
+    транспонированной матрицей весов, поэтому слои заменяются без потери точности.
+    """
+    from transformers.pytorch_utils import Conv1D
+
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, Conv1D):
+                in_features, out_features = child.weight.shape
+                linear = torch.nn.Linear(in_features, out_features)
+                linear.weight = torch.nn.Parameter(child.weight.detach().t().contiguous())
+                linear.bias = torch.nn.Parameter(child.bias.detach().clone())
+                setattr(parent, name, linear)
+
+
+def apply_precision(model: torch.nn.Module, precision: str, device) -> Tuple[torch.nn.Module, str]:
+    """
+    Переводит модель в заданную точность. Возвращает модель и фактически
+    применённый режим: при отсутствии поддержки используется fp32.
+    """
+    precision = precision.lower()
+    if precision not in PRECISIONS:
+        print(f"Unknown MODEL_PRECISION '{precision}', using fp32")
+        return model, 'fp32'
+
+    if precision == 'int8':
+        if str(device) != 'cpu':
+            print("Dynamic int8 quantization is CPU-only, using fp32")
+            return model, 'fp32'
+        _conv1d_to_linear(model)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model.eval(), 'int8'
+
+    if precision == 'bf16':
+        if str(device) == 'cpu' and not cpu_supports_bf16():
+            print("CPU has no native bfloat16 support, using fp32")
+            return model, 'fp32'
+        return model.to(torch.bfloat16).eval(), 'bf16'
+
+    return model, 'fp32'
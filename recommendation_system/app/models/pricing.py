@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+PRICING_CONFIG_PATH = os.getenv("PRICING_CONFIG_PATH", "model/pricing_factors.json")
+PRICING_RELOAD_INTERVAL = float(os.getenv("PRICING_RELOAD_INTERVAL", "30"))
+
+# Тарифы по умолчанию (если файла конфигурации нет) — прежние коэффициенты _estimate_price
+DEFAULT_PRICING_CONFIG: Dict[str, Any] = {
+    "age": {"bands": [25, 51, 66], "factors": [1.3, 1.0, 1.2, 1.4]},
+    "income": {"bands": [1000000, 2000000], "factors": [1.0, 0.95, 0.9]},
+    "medical_conditions": {"Медицинское страхование": 1.3},
+    "children": 1.1,
+    "random_spread": 0.05,
+    "clamp": [0.7, 2.0],
+}
+
+
+class FactorTable:
+    """
+    Коэффициент по диапазону значения: bands — возрастающие границы, factors —
+    на один длиннее. side='right': граница относится к следующему диапазону
+    (возраст 25 — уже второй диапазон), side='left' — к текущему (доход ровно
+    1 000 000 — ещё первый).
+    """
+
+    def __init__(self, bands: Sequence[float], factors: Sequence[float], side: str):
+        self.bands = np.asarray(bands, dtype=np.float64)
+        self.factors = np.asarray(factors, dtype=np.float64)
+        self.side = side
+        if len(self.factors) != len(self.bands) + 1:
+            raise ValueError(f"Expected {len(self.bands) + 1} factors for {len(self.bands)} bands")
+        if np.any(np.diff(self.bands) <= 0):
+            raise ValueError("Bands must be strictly increasing")
+
+    def band(self, value: float) -> int:
+        return int(np.searchsorted(self.bands, value, side=self.side))
+
+    def lookup(self, values: np.ndarray) -> np.ndarray:
+        return self.factors[np.searchsorted(self.bands, values, side=self.side)]
+
+
+class PricingTables:
+    """Разобранная конфигурация тарифов; объект неизменяемый, при перезагрузке заменяется целиком"""
+
+    def __init__(self, config: Dict[str, Any], version: str):
+        self.version = version
+        self.age = FactorTable(config["age"]["bands"], config["age"]["factors"], side='right')
+        self.income = FactorTable(config["income"]["bands"], config["income"]["factors"], side='left')
+        self.medical_factors: Dict[str, float] = {
+            str(category): float(factor) for category, factor in config.get("medical_conditions", {}).items()
+        }
+        self.children_factor = float(config.get("children", 1.0))
+        self.random_spread = float(config.get("random_spread", 0.0))
+        self.clamp_low, self.clamp_high = (float(bound) for bound in config["clamp"])
+        if self.clamp_low > self.clamp_high:
+            raise ValueError("clamp must be [low, high] with low <= high")
+
+    def medical_by_category(self, category_names: Sequence[str]) -> np.ndarray:
+        return np.array([self.medical_factors.get(name, 1.0) for name in category_names], dtype=np.float64)
+
+
+class PricingEngine:
+    """
+    Расчёт estimated_price сразу для P профилей и N продуктов (матрица P×N) через
+    broadcasting по колонке premium каталога:
+
+        premium × age × income × (medical × children) × (1 ± random_spread),
+
+    результат ограничен диапазоном [clamp_low × premium, clamp_high × premium].
+    Коэффициенты читаются из PRICING_CONFIG_PATH; файл перечитывается при изменении
+    (проверка не чаще раза в reload_interval секунд), так что тарифы меняются без деплоя.
+    """
+
+    def __init__(self, path: Optional[str] = PRICING_CONFIG_PATH, reload_interval: float = PRICING_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._checked_at = time.monotonic()
+        self.reloads = 0
+        self.reload_errors = 0
+        self._tables = self._load()
+
+    def _load(self) -> PricingTables:
+        if not self.path or not os.path.exists(self.path):
+            payload = json.dumps(DEFAULT_PRICING_CONFIG, sort_keys=True).encode('utf-8')
+            return PricingTables(DEFAULT_PRICING_CONFIG, "default:" + hashlib.sha256(payload).hexdigest()[:12])
+
+        self._mtime = os.path.getmtime(self.path)
+        with open(self.path, 'rb') as config_file:
+            payload = config_file.read()
+        return PricingTables(json.loads(payload), hashlib.sha256(payload).hexdigest()[:12])
+
+    def tables(self) -> PricingTables:
+        now = time.monotonic()
+        if self.path and now - self._checked_at >= self.reload_interval:
+            with self._lock:
+                if now - self._checked_at >= self.reload_interval:
+                    self._checked_at = now
+                    self._reload_if_changed()
+        return self._tables
+
+    def _reload_if_changed(self) -> None:
+        try:
+            mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+            if mtime == self._mtime:
+                return
+            tables = self._load()
+        except Exception as e:
+            # Ошибка в файле не должна останавливать расчёт: остаются прежние тарифы
+            print(f"Error reloading pricing config {self.path}, keeping version {self._tables.version}: {e}")
+            self.reload_errors += 1
+            return
+
+        if tables.version != self._tables.version:
+            print(f"Pricing config reloaded: {self._tables.version} -> {tables.version}")
+            self.reloads += 1
+        self._tables = tables
+
+    @property
+    def version(self) -> str:
+        return self.tables().version
+
+    def estimate(self, profiles: Sequence[Dict[str, Any]], premium: np.ndarray, category_ids: np.ndarray,
+                 category_names: Sequence[str], units: np.ndarray) -> np.ndarray:
+        """
+        profiles — P профилей; premium и category_ids — колонки N продуктов;
+        units — матрица P×N равномерных чисел в [0, 1) для случайной надбавки.
+        """
+        tables = self.tables()
+
+        ages = np.array([profile['age'] for profile in profiles], dtype=np.float64)
+        incomes = np.array([profile['income'] for profile in profiles], dtype=np.float64)
+        has_medical = np.array([bool(profile['has_medical_conditions']) for profile in profiles])
+        has_children = np.array([bool(profile['has_children']) for profile in profiles])
+
+        age_factor = tables.age.lookup(ages)[:, None]
+        income_factor = tables.income.lookup(incomes)[:, None]
+        medical = tables.medical_by_category(category_names)[category_ids]
+        medical_factor = np.where(has_medical[:, None], medical[None, :], 1.0)
+        children_factor = np.where(has_children, tables.children_factor, 1.0)[:, None]
+        random_factor = 1.0 + (units * (2 * tables.random_spread) - tables.random_spread)
+
+        estimated = premium * age_factor * income_factor * (medical_factor * children_factor) * random_factor
+        return np.minimum(premium * tables.clamp_high, np.maximum(premium * tables.clamp_low, estimated))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self._tables.version,
+            "path": self.path,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+        }
+
+
+pricing_engine = PricingEngine()
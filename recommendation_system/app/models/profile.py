@@ -0,0 +1,36 @@
+import hashlib
+import json
+from typing import Any, Dict, Tuple
+
+from app.models.pricing import pricing_engine
+
+CATEGORICAL_FIELDS = ('gender', 'occupation', 'marital_status', 'travel_frequency')
+BOOLEAN_FIELDS = ('has_children', 'has_vehicle', 'has_home', 'has_medical_conditions')
+
+
+# Диапазоны берутся из текущих тарифов: профили одного диапазона получают одинаковые коэффициенты цены
+def age_band(age: float) -> int:
+    return pricing_engine.tables().age.band(age)
+
+
+def income_band(income: float) -> int:
+    return pricing_engine.tables().income.band(income)
+
+
+def canonical_profile(user_data: Dict[str, Any], bucketed: bool = False) -> Tuple:
+    """
+    Профиль в каноническом виде: категориальные поля без учёта регистра и пробелов,
+    булевы флаги, возраст и доход — точные или (bucketed) номера диапазонов.
+    """
+    categorical = tuple(str(user_data.get(field) or '').strip().lower() for field in CATEGORICAL_FIELDS)
+    flags = tuple(bool(user_data.get(field)) for field in BOOLEAN_FIELDS)
+    if bucketed:
+        numeric = ('band', age_band(user_data['age']), income_band(user_data['income']))
+    else:
+        numeric = ('exact', int(user_data['age']), float(user_data['income']))
+    return categorical + flags + numeric
+
+
+def profile_hash(user_data: Dict[str, Any], bucketed: bool = False) -> str:
+    payload = json.dumps(canonical_profile(user_data, bucketed), ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
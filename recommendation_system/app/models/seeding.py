@@ -0,0 +1,37 @@
+from typing import Any, Dict, Sequence
+
+import numpy as np
+
+from app.models.profile import profile_hash
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def profile_seed(user_data: Dict[str, Any]) -> int:
+    """64-битное зерно из канонического хэша профиля (точные возраст и доход)"""
+    return int(profile_hash(user_data)[:16], 16)
+
+
+def _splitmix64(values: np.ndarray) -> np.ndarray:
+    with np.errstate(over='ignore'):
+        z = values + _GOLDEN
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return (z ^ (z >> np.uint64(31))) & _MASK64
+
+
+def seeded_uniform(seed: int, product_ids: Sequence[int], low: float = 0.0, high: float = 1.0,
+                   stream: int = 0) -> np.ndarray:
+    """
+    Детерминированные равномерные числа в [low, high) для пары (зерно, product_id):
+    значение для продукта не зависит ни от порядка, ни от состава каталога.
+    stream разделяет независимые источники шума (скоринг, цена) при одном зерне.
+    """
+    ids = np.asarray(product_ids, dtype=np.int64).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        key = np.uint64(seed) ^ (np.uint64(stream) * _GOLDEN)
+        mixed = _splitmix64(_splitmix64(ids ^ key) + key)
+    # Старшие 53 бита — мантисса double в [0, 1)
+    unit = (mixed >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+    return low + unit * (high - low)
@@ -0,0 +1,102 @@
+import heapq
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _rank_order(scores: np.ndarray, indexes: np.ndarray) -> np.ndarray:
+    """indexes по убыванию оценки, при равенстве — по возрастанию индекса (как stable argsort)"""
+    return indexes[np.lexsort((indexes, -scores[indexes]))]
+
+
+def _category_heads(scores: np.ndarray, categories: np.ndarray) -> np.ndarray:
+    """Лучший кандидат каждой категории за O(n) (при равных оценках — с меньшим индексом)"""
+    size = int(categories.max()) + 1
+    best = np.full(size, -np.inf)
+    np.maximum.at(best, categories, scores)
+    is_best = scores == best[categories]
+    first = np.full(size, len(scores), dtype=np.int64)
+    np.minimum.at(first, categories[is_best], np.flatnonzero(is_best))
+    return first[first < len(scores)]
+
+
+def _top_indexes(scores: np.ndarray, count: int) -> np.ndarray:
+    """Все кандидаты с оценкой не ниже count-й по величине — O(n) через argpartition"""
+    if count >= len(scores):
+        return np.arange(len(scores))
+    threshold = scores[np.argpartition(-scores, count - 1)[count - 1]]
+    return np.flatnonzero(scores >= threshold)
+
+
+def _greedy(scores: np.ndarray, categories: np.ndarray, pool: np.ndarray, top_n: int,
+            category_cap: Optional[int], diversity: float) -> List[int]:
+    """
+    Отбор по пулу, упорядоченному по убыванию оценки. В каждой категории следующий
+    кандидат — лучший из оставшихся, поэтому достаточно сравнить две головы куч:
+    лучшую ещё не представленную категорию и лучшую уже представленную.
+    """
+    queues: Dict[int, Deque[int]] = {}
+    for rank, category in enumerate(categories[pool].tolist()):
+        queues.setdefault(category, deque()).append(rank)
+
+    pool_scores = scores[pool].tolist()
+    new_heap: List[Tuple[int, int]] = [(queue.popleft(), category) for category, queue in queues.items()]
+    heapq.heapify(new_heap)
+    seen_heap: List[Tuple[int, int]] = []
+    counts: Dict[int, int] = {}
+    picks: List[int] = []
+
+    while len(picks) < top_n and (new_heap or seen_heap):
+        if new_heap and seen_heap:
+            # MMR с похожестью 1 внутри категории и 0 между категориями
+            new_value = (1.0 - diversity) * pool_scores[new_heap[0][0]]
+            seen_value = (1.0 - diversity) * pool_scores[seen_heap[0][0]] - diversity
+            use_new = new_value > seen_value or (new_value == seen_value and new_heap[0][0] < seen_heap[0][0])
+            heap = new_heap if use_new else seen_heap
+        else:
+            heap = new_heap or seen_heap
+
+        rank, category = heapq.heappop(heap)
+        picks.append(int(pool[rank]))
+        counts[category] = counts.get(category, 0) + 1
+
+        queue = queues[category]
+        if queue and (category_cap is None or counts[category] < category_cap):
+            heapq.heappush(seen_heap, (queue.popleft(), category))
+
+    return picks
+
+
+def select_top_k(scores: np.ndarray, categories: np.ndarray, top_n: int, category_cap: Optional[int] = None,
+                 diversity: float = 1.0) -> np.ndarray:
+    """
+    Индексы top_n кандидатов с разнообразием категорий, без полной сортировки.
+
+    diversity — вес MMR: 1.0 — сначала лучший продукт каждой категории по порядку
+    оценок, затем оставшиеся места по оценке (прежний _select_diverse); 0.0 — просто
+    top_n по оценке; промежуточные значения штрафуют повтор категории на diversity
+    против доли оценки (1 - diversity). category_cap ограничивает число продуктов
+    одной категории в выдаче.
+
+    Пул — лучшие ~2·top_n кандидатов по оценке плюс top_n лучших кандидатов разных
+    категорий (O(n)); отбор по пулу — две кучи, O(log k) на шаг. Если пула не хватило
+    (например, из-за category_cap), он расширяется.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    categories = np.asarray(categories)
+    if top_n <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Новые категории берутся в порядке оценки их лучших кандидатов, так что в выдачу
+    # может попасть не больше top_n лучших голов категорий
+    heads = _category_heads(scores, categories)
+    heads = heads[_top_indexes(scores[heads], top_n)]
+    count = min(len(scores), 2 * top_n)
+    while True:
+        pool = _rank_order(scores, np.union1d(_top_indexes(scores, count), heads))
+        picks = _greedy(scores, categories, pool, top_n, category_cap, diversity)
+        # Кандидаты вне пула хуже любого в пуле; их не хватило только если выдача неполная
+        if len(picks) == top_n or len(pool) == len(scores):
+            return np.asarray(picks, dtype=np.int64)
+        count = min(len(scores), count * 4)
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+class _PendingRequest:
+    __slots__ = ("results", "remaining", "done", "error")
+
+    def __init__(self, size: int):
+        self.results: List[Optional[str]] = [None] * size
+        self.remaining = size
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class _PendingPrompt:
+    __slots__ = ("prompt", "request", "index", "enqueued_at")
+
+    def __init__(self, prompt: str, request: _PendingRequest, index: int):
+        self.prompt = prompt
+        self.request = request
+        self.index = index
+        self.enqueued_at = time.monotonic()
+
+
+class GenerationBatchScheduler:
+    """
+    Собирает промпты от всех выполняющихся запросов в микробатчи и прогоняет их
+    одним вызовом generate_batch(prompts, max_length). Батч закрывается, когда
+    набрано max_batch_size промптов с одинаковой длиной генерации или самый старый
+    промпт прождал max_wait_ms.
+    """
+
+    def __init__(self, generate_batch: Callable[[List[str], int], List[str]],
+                 max_batch_size: int = 32, max_wait_ms: float = 10.0):
+        self.generate_batch = generate_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queues: Dict[int, Deque[_PendingPrompt]] = {}
+        self._condition = threading.Condition()
+        self._stopped = False
+
+        self.batches = 0
+        self.batched_prompts = 0
+        self.max_observed_batch = 0
+        self.total_queue_wait_seconds = 0.0
+
+        self._worker = threading.Thread(target=self._run, name="generation-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, prompts: List[str], max_length: int) -> List[str]:
+        """Блокирует вызывающий поток до получения всех ответов."""
+        if not prompts:
+            return []
+
+        request = _PendingRequest(len(prompts))
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("Generation batch scheduler is stopped")
+            queue = self._queues.setdefault(max_length, deque())
+            queue.extend(_PendingPrompt(prompt, request, index) for index, prompt in enumerate(prompts))
+            self._condition.notify_all()
+
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.results
+
+    def _oldest_length(self) -> Optional[int]:
+        oldest = None
+        for max_length, queue in self._queues.items():
+            if queue and (oldest is None or queue[0].enqueued_at < self._queues[oldest][0].enqueued_at):
+                oldest = max_length
+        return oldest
+
+    def _next_batch(self):
+        with self._condition:
+            while True:
+                if self._stopped:
+                    return None, []
+
+                max_length = self._oldest_length()
+                if max_length is None:
+                    self._condition.wait()
+                    continue
+
+                queue = self._queues[max_length]
+                deadline = queue[0].enqueued_at + self.max_wait
+                remaining = deadline - time.monotonic()
+                if len(queue) < self.max_batch_size and remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+
+                batch = [queue.popleft() for _ in range(min(self.max_batch_size, len(queue)))]
+                return max_length, batch
+
+    def _run(self):
+        while True:
+            max_length, batch = self._next_batch()
+            if not batch:
+                return
+
+            started_at = time.monotonic()
+            try:
+                texts = self.generate_batch([item.prompt for item in batch], max_length)
+                error = None
+            except Exception as e:
+                texts = []
+                error = e
+
+            with self._condition:
+                self.batches += 1
+                self.batched_prompts += len(batch)
+                self.max_observed_batch = max(self.max_observed_batch, len(batch))
+                self.total_queue_wait_seconds += sum(started_at - item.enqueued_at for item in batch)
+
+            for position, item in enumerate(batch):
+                request = item.request
+                if error is not None:
+                    request.error = error
+                else:
+                    request.results[item.index] = texts[position]
+                request.remaining -= 1
+                if request.remaining == 0 or error is not None:
+                    request.done.set()
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._stopped = True
+            pending = [item for queue in self._queues.values() for item in queue]
+            self._queues.clear()
+            self._condition.notify_all()
+
+        for item in pending:
+            item.request.error = RuntimeError("Generation batch scheduler is stopped")
+            item.request.done.set()
+
+        self._worker.join(timeout=5)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queued_prompts": sum(len(queue) for queue in self._queues.values()),
+                "batches": self.batches,
+                "batched_prompts": self.batched_prompts,
+                "avg_batch_size": self.batched_prompts / self.batches if self.batches else 0.0,
+                "max_batch_size_observed": self.max_observed_batch,
+                "avg_queue_wait_ms": (self.total_queue_wait_seconds / self.batched_prompts * 1000.0
+                                      if self.batched_prompts else 0.0),
+            }
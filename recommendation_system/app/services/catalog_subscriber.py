@@ -0,0 +1,154 @@
+import json
+import select
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+CATALOG_CHANNEL = "catalog_changed"
+
+
+class CatalogSubscriber:
+    """
+    Подписка на канал catalog_changed (LISTEN). Триггеры на insurance_products и
+    insurance_categories присылают таблицу, операцию и id строки; уведомления,
+    пришедшие в течение debounce_ms, объединяются и применяются к модели одним
+    инкрементальным обновлением в фоновом потоке — запросы его не ждут.
+    После (пере)подключения каталог сверяется по версии: уведомления, отправленные
+    без подписчика, теряются. Сами триггеры создаёт миграция Alembic
+    (catalog_notify_triggers); подписчик только слушает канал и DDL не выполняет.
+    """
+
+    def __init__(self, model, dsn: str, debounce_ms: float = 200.0, reconnect_max_backoff: float = 30.0):
+        self.model = model
+        self.dsn = dsn
+        self.debounce = debounce_ms / 1000.0
+        self.reconnect_max_backoff = reconnect_max_backoff
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._conn = None
+        self._lock = threading.Lock()
+
+        self.connected = False
+        self.notifications = 0
+        self.refreshes = 0
+        self.products_changed = 0
+        self.reconnects = 0
+        self.last_refresh_ms = None
+        self.last_refresh_at = None
+        self.last_error = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-subscriber", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CATALOG_CHANNEL};")
+        return conn
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                self._conn = self._connect()
+                with self._lock:
+                    self.connected = True
+                    self.last_error = None
+                backoff = 1.0
+                # Изменения, пропущенные без подписки, подхватываются сверкой версии
+                self.model.refresh_catalog_if_changed()
+                self._listen()
+            except Exception as e:
+                with self._lock:
+                    self.connected = False
+                    self.reconnects += 1
+                    self.last_error = str(e)
+                print(f"Catalog subscriber error, reconnecting in {backoff:.0f}s: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, self.reconnect_max_backoff)
+            finally:
+                if self._conn is not None:
+                    try:
+                        self._conn.close()
+                    except Exception:
+                        pass
+                    self._conn = None
+
+    def _wait_notifications(self, timeout: float) -> bool:
+        if select.select([self._conn], [], [], timeout) == ([], [], []):
+            return False
+        self._conn.poll()
+        return bool(self._conn.notifies)
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            if not self._wait_notifications(1.0):
+                continue
+
+            # Пачка изменений (например, массовый UPDATE) применяется за один раз
+            deadline = time.monotonic() + self.debounce
+            while time.monotonic() < deadline and self._wait_notifications(max(0.0, deadline - time.monotonic())):
+                pass
+
+            product_ids: Set[int] = set()
+            category_ids: Set[int] = set()
+            count = 0
+            while self._conn.notifies:
+                notify = self._conn.notifies.pop(0)
+                count += 1
+                try:
+                    payload = json.loads(notify.payload)
+                except ValueError:
+                    continue
+                if payload.get('table') == 'insurance_products':
+                    product_ids.add(int(payload['id']))
+                elif payload.get('table') == 'insurance_categories':
+                    category_ids.add(int(payload['id']))
+
+            self._apply(count, product_ids, category_ids)
+
+    def _apply(self, count: int, product_ids: Set[int], category_ids: Set[int]) -> None:
+        started = time.perf_counter()
+        try:
+            changed = self.model.apply_catalog_changes(product_ids, category_ids)
+        except Exception as e:
+            print(f"Error applying catalog changes: {e}")
+            with self._lock:
+                self.notifications += count
+                self.last_error = str(e)
+            return
+
+        with self._lock:
+            self.notifications += count
+            self.refreshes += 1
+            self.products_changed += changed
+            self.last_refresh_ms = (time.perf_counter() - started) * 1000
+            self.last_refresh_at = time.time()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "connected": self.connected,
+                "notifications": self.notifications,
+                "refreshes": self.refreshes,
+                "products_changed": self.products_changed,
+                "reconnects": self.reconnects,
+                "last_refresh_ms": self.last_refresh_ms,
+                "last_refresh_at": self.last_refresh_at,
+                "last_error": self.last_error,
+            }
@@ -1,9 +1,58 @@
-from typing import List
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
 import os
+import threading
+import time
+from app.models import ml_model
 from app.models.ml_model import InsuranceRecommenderModel
-from app.models.insurance_models import InsuranceRecommendation, InsuranceRecommendationRequest
+from app.models.insurance_models import (InsuranceEnrichment, InsuranceRecommendation,
+                                         InsuranceRecommendationRequest, RankedInsurance)
+from app.services.inference_executor import InferenceExecutor
+from app.services.batch_scheduler import GenerationBatchScheduler
+from app.services.singleflight import SingleFlight
+from app.services.response_cache import ResponseCache, make_shared_tier
+from app.services.startup import StartupProgress
+from app.services.catalog_subscriber import CatalogSubscriber
+from app.models.profile import profile_hash
 
 MODEL_PATH = os.getenv("MODEL_PATH", "microsoft/DialoGPT-small")
+MODEL_PRECISION = os.getenv("MODEL_PRECISION", "fp32")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "4"))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "32"))
+BATCH_SCHEDULER_ENABLED = os.getenv("BATCH_SCHEDULER_ENABLED", "true").lower() == "true"
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "10"))
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+PROFILE_BUCKETING = os.getenv("PROFILE_BUCKETING", "false").lower() == "true"
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "600"))
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL")
+CATALOG_VERSION_CHECK_INTERVAL = float(os.getenv("CATALOG_VERSION_CHECK_INTERVAL", "30"))
+CATALOG_LOAD_MAX_BACKOFF = float(os.getenv("CATALOG_LOAD_MAX_BACKOFF", "30"))
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+CATALOG_SUBSCRIBER_ENABLED = os.getenv("CATALOG_SUBSCRIBER_ENABLED", "true").lower() == "true"
+CATALOG_REFRESH_DEBOUNCE_MS = float(os.getenv("CATALOG_REFRESH_DEBOUNCE_MS", "200"))
+
+STARTUP_STAGES = ["catalog", "model", "indexes", "warmup"]
+
+# Профиль для прогревочного запроса: проходит весь конвейер, включая генерацию
+WARMUP_PROFILE = {
+    "age": 35,
+    "gender": "male",
+    "occupation": "IT",
+    "income": 1500000.0,
+    "marital_status": "married",
+    "has_children": True,
+    "has_vehicle": True,
+    "has_home": True,
+    "has_medical_conditions": False,
+    "travel_frequency": "rarely",
+}
+
+
+class ServiceNotReadyError(Exception):
+    pass
 
 
 class RecommendationService:
@@ -12,15 +61,268 @@ class RecommendationService:
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(RecommendationService, cls).__new__(cls)
-            cls._instance.model = InsuranceRecommenderModel(MODEL_PATH)
+            # Конструктор ничего не загружает: каталог и модель загружаются по этапам в load()
+            cls._instance.model = InsuranceRecommenderModel(MODEL_PATH, MODEL_PRECISION, lazy=True)
+            cls._instance.startup = StartupProgress(STARTUP_STAGES)
+            cls._instance._load_lock = threading.Lock()
+            cls._instance.response_cache = None
+            if RESPONSE_CACHE_ENABLED:
+                cls._instance.response_cache = ResponseCache(
+                    RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, make_shared_tier(RESPONSE_CACHE_REDIS_URL)
+                )
+            cls._instance._catalog_checked_at = time.monotonic()
+            cls._instance._catalog_refresh = None
+            cls._instance.catalog_subscriber = None
+            if CATALOG_SUBSCRIBER_ENABLED:
+                cls._instance.catalog_subscriber = CatalogSubscriber(
+                    cls._instance.model, ml_model.database_url, CATALOG_REFRESH_DEBOUNCE_MS
+                )
+            cls._instance._start_runtime()
         return cls._instance
 
+    def _start_runtime(self):
+        # Потоки и примитивы синхронизации не переживают fork, поэтому создаются отдельно от модели
+        self.executor = InferenceExecutor(INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE)
+        self.singleflight = SingleFlight() if SINGLEFLIGHT_ENABLED else None
+        self.batch_scheduler = None
+        if BATCH_SCHEDULER_ENABLED:
+            self.batch_scheduler = GenerationBatchScheduler(
+                self.model._generate_batch, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS
+            )
+        self.model.batch_scheduler = self.batch_scheduler
+
+    def prepare_fork(self):
+        """Останавливает фоновые потоки перед fork рабочих процессов (см. serve.py)"""
+        if self.catalog_subscriber is not None:
+            self.catalog_subscriber.stop()
+        self.executor.shutdown()
+        if self.batch_scheduler is not None:
+            self.batch_scheduler.shutdown()
+        self.model.batch_scheduler = None
+
+    def after_fork(self):
+        """В рабочем процессе: свои пул инференса, планировщик и подписка на каталог, модель общая с родителем"""
+        self._start_runtime()
+        if self.catalog_subscriber is not None and self.ready:
+            self.catalog_subscriber.start()
+
+    @property
+    def ready(self) -> bool:
+        return self.startup.ready
+
+    def load(self):
+        """
+        Этапы запуска: каталог (с повторами, пока база недоступна), веса модели,
+        индексы и кэш контента, прогревочный запрос. После них сервис готов.
+        """
+        with self._load_lock:
+            if self.startup.ready:
+                return
+
+            with self.startup.stage("catalog"):
+                backoff = 1.0
+                while True:
+                    try:
+                        self.model._load_data_from_database()
+                        break
+                    except Exception as e:
+                        attempt = self.startup.attempt("catalog", str(e))
+                        print(f"Catalog load attempt {attempt} failed, retrying in {backoff:.0f}s")
+                        time.sleep(backoff)
+                        backoff = min(backoff * 2, CATALOG_LOAD_MAX_BACKOFF)
+
+            with self.startup.stage("model"):
+                self.model.load_model()
+
+            with self.startup.stage("indexes"):
+                self.model.build_indexes()
+
+            with self.startup.stage("warmup"):
+                if WARMUP_ENABLED:
+                    self.model.get_recommendations(WARMUP_PROFILE)
+
+            self.startup.mark_ready()
+            print(f"Recommendation service is ready: {self.startup.stats()}")
+
+        if self.catalog_subscriber is not None:
+            self.catalog_subscriber.start()
+
+    async def start(self):
+        """Загрузка в фоне: uvicorn уже принимает соединения, /api/ready отвечает 503 до готовности"""
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.load)
+        except Exception as e:
+            print(f"Recommendation service failed to start: {e}")
+
+    @staticmethod
+    def _profile_key(user_data: Dict[str, Any], bucketed: bool) -> str:
+        """
+        Ключ профиля для кэша и singleflight. В DETERMINISTIC_MODE зерно и текст причины
+        зависят от точных возраста и дохода, поэтому профили одного диапазона не
+        объединяются: иначе ответ зависел бы от того, какой профиль пришёл первым.
+        """
+        return profile_hash(user_data, bucketed=bucketed and not ml_model.DETERMINISTIC_MODE)
+
     async def get_recommendations(self, request: InsuranceRecommendationRequest) -> List[InsuranceRecommendation]:
         user_data = request.dict()
 
+        if not self.startup.ready:
+            raise ServiceNotReadyError("Recommendation service is warming up")
+
         try:
-            recommendations = self.model.get_recommendations(user_data)
-            return [InsuranceRecommendation(**recommendation) for recommendation in recommendations]
+            cache_key = None
+            if self.response_cache is not None:
+                catalog_version = await self._catalog_version()
+                if catalog_version is not None:
+                    cache_key = ResponseCache.key(catalog_version, self._profile_key(user_data, bucketed=True))
+                    cached = await self._cache_call(self.response_cache.get, cache_key)
+                    if cached is not None:
+                        return [InsuranceRecommendation(**recommendation) for recommendation in cached]
+
+            if self.singleflight is None:
+                recommendations = await self._compute_recommendations(user_data)
+            else:
+                # Одновременные запросы с одинаковым профилем разделяют одно вычисление
+                key = self._profile_key(user_data, bucketed=PROFILE_BUCKETING)
+                recommendations = await self.singleflight.run(key, self._compute_recommendations, user_data)
+
+            if cache_key is not None:
+                await self._cache_call(self.response_cache.put, cache_key,
+                                       [recommendation.dict() for recommendation in recommendations])
+            return recommendations
         except Exception as e:
             print(f"Error in recommendation service: {str(e)}")
             raise
+
+    async def stream_recommendations(self, request: InsuranceRecommendationRequest
+                                     ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Потоковая выдача: ("ranked", [RankedInsurance]) сразу после ранжирования, затем
+        ("product", InsuranceEnrichment) для каждого продукта по мере генерации.
+        Ответ из кэша отдаётся теми же событиями без ожидания; собранный поток
+        кладётся в кэш, так что обычный запрос с тем же профилем его переиспользует.
+        """
+        user_data = request.dict()
+
+        if not self.startup.ready:
+            raise ServiceNotReadyError("Recommendation service is warming up")
+
+        cache_key = None
+        if self.response_cache is not None:
+            catalog_version = await self._catalog_version()
+            if catalog_version is not None:
+                cache_key = ResponseCache.key(catalog_version, self._profile_key(user_data, bucketed=True))
+                cached = await self._cache_call(self.response_cache.get, cache_key)
+                if cached is not None:
+                    recommendations = [InsuranceRecommendation(**recommendation) for recommendation in cached]
+                    yield "ranked", [RankedInsurance(**recommendation.dict()) for recommendation in recommendations]
+                    for recommendation in recommendations:
+                        yield "product", InsuranceEnrichment(**recommendation.dict())
+                    return
+
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def produce():
+            # События передаются в event loop по одному; если клиент отключился,
+            # генерация оставшихся продуктов не запускается
+            for event in self.model.stream_recommendations(user_data):
+                loop.call_soon_threadsafe(events.put_nowait, event)
+                if cancelled.is_set():
+                    break
+
+        job = asyncio.ensure_future(self.executor.run(produce))
+        # Завершение задачи приходит в event loop после всех её событий
+        job.add_done_callback(lambda _: events.put_nowait(None))
+
+        ranked: List[RankedInsurance] = []
+        enrichments: Dict[int, InsuranceEnrichment] = {}
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                name, data = event
+                if name == "ranked":
+                    ranked = [RankedInsurance(**product) for product in data]
+                    yield name, ranked
+                else:
+                    enrichment = InsuranceEnrichment(**data)
+                    enrichments[enrichment.product_id] = enrichment
+                    yield name, enrichment
+            await job
+        finally:
+            cancelled.set()
+            # Если клиент отключился, задача доработает в фоне, и её ошибка уже никому не нужна
+            job.add_done_callback(lambda future: future.cancelled() or future.exception())
+
+        if cache_key is not None:
+            recommendations = [
+                InsuranceRecommendation(**product.dict(), **enrichments[product.product_id].dict(exclude={"product_id"}))
+                for product in ranked if product.product_id in enrichments
+            ]
+            await self._cache_call(self.response_cache.put, cache_key,
+                                   [recommendation.dict() for recommendation in recommendations])
+
+    async def _catalog_version(self) -> Optional[str]:
+        """
+        Версия каталога и тарифов: цены в кэшированных ответах зависят от обоих.
+        Пока подписчик на изменения каталога подключён, обновлениями занимается он;
+        иначе каталог не чаще раза в CATALOG_VERSION_CHECK_INTERVAL сверяется с базой
+        в фоне, а запрос обслуживается текущим снимком.
+        """
+        now = time.monotonic()
+        subscribed = self.catalog_subscriber is not None and self.catalog_subscriber.connected
+        refreshing = self._catalog_refresh is not None and not self._catalog_refresh.done()
+        if not subscribed and not refreshing and now - self._catalog_checked_at >= CATALOG_VERSION_CHECK_INTERVAL:
+            self._catalog_checked_at = now
+            self._catalog_refresh = asyncio.get_running_loop().run_in_executor(
+                None, self.model.refresh_catalog_if_changed
+            )
+
+        catalog_version = self.model.catalog_version
+        if catalog_version is None:
+            return None
+        catalog_version = f"{catalog_version}:{self.model.pricing.version}"
+        self.response_cache.set_catalog_version(catalog_version)
+        return catalog_version
+
+    async def _cache_call(self, func, *args):
+        # Обращение к общему уровню кэша — сетевой вызов, его не выполняем в event loop
+        if self.response_cache.shared is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def _compute_recommendations(self, user_data: Dict[str, Any]) -> List[InsuranceRecommendation]:
+        recommendations = await self.executor.run(self.model.get_recommendations, user_data)
+        return [InsuranceRecommendation(**recommendation) for recommendation in recommendations]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = {
+            "catalog": self.model.catalog_stats(),
+            "pricing": self.model.pricing.stats(),
+            "content_store": self.model.content_store.stats(),
+            "content_cache": self.model.content_cache.stats(),
+            "inference": self.executor.stats(),
+            "generation": self.model.generation_stats(),
+            "startup": self.startup.stats()
+        }
+        if self.model.embedding_index is not None:
+            metrics["embedding_index"] = self.model.embedding_index.stats()
+        if self.batch_scheduler is not None:
+            metrics["batch_scheduler"] = self.batch_scheduler.stats()
+        if self.singleflight is not None:
+            metrics["singleflight"] = self.singleflight.stats()
+        if self.response_cache is not None:
+            metrics["response_cache"] = self.response_cache.stats()
+        if self.catalog_subscriber is not None:
+            metrics["catalog_subscriber"] = self.catalog_subscriber.stats()
+        return metrics
+
+    def shutdown(self):
+        if self.catalog_subscriber is not None:
+            self.catalog_subscriber.stop()
+        self.executor.shutdown()
+        if self.batch_scheduler is not None:
+            self.batch_scheduler.shutdown()
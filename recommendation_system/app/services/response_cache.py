@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+CachedResponse = List[Dict[str, Any]]
+
+
+class RedisResponseTier:
+    """Общий для всех процессов и реплик сервиса уровень кэша (Redis, пакет redis — необязательная зависимость)."""
+
+    def __init__(self, url: str, prefix: str = "recommendations:", socket_timeout: float = 0.1):
+        import redis
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=socket_timeout, socket_connect_timeout=socket_timeout)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(self.prefix + key)
+
+    def set(self, key: str, payload: bytes, ttl_seconds: float) -> None:
+        self._client.set(self.prefix + key, payload, ex=max(1, int(ttl_seconds)))
+
+
+def make_shared_tier(url: Optional[str]) -> Optional[RedisResponseTier]:
+    if not url:
+        return None
+    try:
+        return RedisResponseTier(url)
+    except ImportError:
+        print("RESPONSE_CACHE_REDIS_URL is set, but the redis package is not installed; shared cache tier disabled")
+    except Exception as e:
+        print(f"Error connecting to shared response cache, using in-process tier only: {e}")
+    return None
+
+
+class ResponseCache:
+    """
+    Кэш готовых ответов /api/recommendations. Ключ — версия каталога и хэш профиля
+    (возраст и доход по диапазонам), значение — сериализованный JSON, так что размер
+    кэша в байтах известен точно, а формат совпадает с общим уровнем (shared).
+    При смене версии каталога записи прежних версий удаляются из LRU; в общем уровне
+    они перестают совпадать по ключу и истекают по TTL.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 600.0, shared: Optional[Any] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._catalog_version: Optional[str] = None
+        self.memory_bytes = 0
+
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.shared_errors = 0
+
+    @staticmethod
+    def key(catalog_version: str, profile_key: str) -> str:
+        return f"{catalog_version}:{profile_key}"
+
+    def _remove(self, key: str) -> None:
+        _, payload = self._entries.pop(key)
+        self.memory_bytes -= len(payload)
+
+    def _store(self, key: str, payload: bytes, expires_at: float) -> None:
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expires_at, payload)
+        self.memory_bytes += len(payload)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def set_catalog_version(self, catalog_version: str) -> None:
+        """Новая версия каталога: все ответы, посчитанные по прежнему каталогу, удаляются"""
+        with self._lock:
+            if catalog_version == self._catalog_version:
+                return
+            stale = [key for key in self._entries if not key.startswith(catalog_version + ":")]
+            for key in stale:
+                self._remove(key)
+            if self._catalog_version is not None:
+                self.invalidations += 1
+            self._catalog_version = catalog_version
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, payload = entry
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.local_hits += 1
+                    return json.loads(payload)
+                self._remove(key)
+                self.evictions += 1
+
+        payload = None
+        if self.shared is not None:
+            try:
+                payload = self.shared.get(key)
+            except Exception as e:
+                print(f"Error reading shared response cache: {e}")
+                with self._lock:
+                    self.shared_errors += 1
+
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+            self._store(key, payload, time.monotonic() + self.ttl_seconds)
+        return json.loads(payload)
+
+    def put(self, key: str, response: CachedResponse) -> None:
+        payload = json.dumps(response, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        with self._lock:
+            self._store(key, payload, time.monotonic() + self.ttl_seconds)
+
+        if self.shared is not None:
+            try:
+                self.shared.set(key, payload, self.ttl_seconds)
+            except Exception as e:
+                print(f"Error writing shared response cache: {e}")
+                with self._lock:
+                    self.shared_errors += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.memory_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.local_hits + self.shared_hits + self.misses
+            return {
+                "catalog_version": self._catalog_version,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "memory_bytes": self.memory_bytes,
+                "shared_tier": self.shared is not None,
+                "local_hits": self.local_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "shared_errors": self.shared_errors,
+                "hit_ratio": (self.local_hits + self.shared_hits) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,42 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные запросы с одинаковым ключом: вычисление выполняется
+    один раз, остальные вызовы ждут его результат (или исключение). Вычисление
+    идёт в отдельной задаче, поэтому отмена одного из ожидающих его не прерывает.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+
+        self.executed = 0
+        self.coalesced = 0
+
+    async def run(self, key: str, func: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executed += 1
+            task = asyncio.ensure_future(func(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: "asyncio.Task[Any]") -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            # Исключение забирается здесь, даже если все ожидающие уже отменены
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.executed + self.coalesced
+        return {
+            "in_flight": len(self._inflight),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalescing_ratio": self.coalesced / total if total else 0.0,
+        }
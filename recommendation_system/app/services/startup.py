@@ -0,0 +1,70 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+
+class StartupProgress:
+    """
+    Этапы запуска сервиса и их длительность. Сервис считается готовым
+    (GET /api/ready отвечает 200) только после успешного завершения всех этапов.
+    """
+
+    def __init__(self, stages: List[str]):
+        self.stages = list(stages)
+        self.started_at = time.time()
+        self._started_monotonic = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.current = None
+        self.ready = False
+        self.error = None
+        self.ready_after_seconds = None
+        self.durations: Dict[str, float] = {}
+        self.attempts: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        with self._lock:
+            self.current = name
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            with self._lock:
+                self.error = f"{name}: {e}"
+            raise
+        finally:
+            with self._lock:
+                self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - started
+
+    def attempt(self, name: str, error: str) -> int:
+        with self._lock:
+            self.attempts[name] = self.attempts.get(name, 0) + 1
+            self.error = f"{name}: {error}"
+            return self.attempts[name]
+
+    def mark_ready(self) -> None:
+        with self._lock:
+            self.current = None
+            self.error = None
+            self.ready = True
+            self.ready_after_seconds = time.monotonic() - self._started_monotonic
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "current_stage": self.current,
+                "error": self.error,
+                "started_at": self.started_at,
+                "ready_after_seconds": self.ready_after_seconds,
+                "stages": [
+                    {
+                        "name": name,
+                        "seconds": self.durations.get(name),
+                        "failed_attempts": self.attempts.get(name, 0),
+                    }
+                    for name in self.stages
+                ],
+            }
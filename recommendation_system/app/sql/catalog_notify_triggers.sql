@@ -0,0 +1,61 @@
+-- Уведомления об изменениях каталога для сервиса рекомендаций (LISTEN catalog_changed).
+-- Применяется миграцией Alembic (migrations/versions/3f6c2a9d4b1e_catalog_notify_triggers.py).
+-- Существующие триггеры не пересоздаются, чтобы не брать блокировку таблиц каталога.
+SELECT pg_advisory_xact_lock(hashtext('catalog_notify_triggers'));
+
+-- updated_at обновляется при любом изменении строки: по нему сервис находит изменённые продукты
+CREATE OR REPLACE FUNCTION touch_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_catalog_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    row_id INTEGER;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_id := OLD.id;
+    ELSE
+        row_id := NEW.id;
+    END IF;
+
+    PERFORM pg_notify('catalog_changed', json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'id', row_id)::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_insurance_products_touch') THEN
+        CREATE TRIGGER trg_insurance_products_touch
+        BEFORE UPDATE ON insurance_products
+        FOR EACH ROW
+        EXECUTE FUNCTION touch_updated_at();
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_insurance_categories_touch') THEN
+        CREATE TRIGGER trg_insurance_categories_touch
+        BEFORE UPDATE ON insurance_categories
+        FOR EACH ROW
+        EXECUTE FUNCTION touch_updated_at();
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_insurance_products_notify') THEN
+        CREATE TRIGGER trg_insurance_products_notify
+        AFTER INSERT OR UPDATE OR DELETE ON insurance_products
+        FOR EACH ROW
+        EXECUTE FUNCTION notify_catalog_change();
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_insurance_categories_notify') THEN
+        CREATE TRIGGER trg_insurance_categories_notify
+        AFTER INSERT OR UPDATE OR DELETE ON insurance_categories
+        FOR EACH ROW
+        EXECUTE FUNCTION notify_catalog_change();
+    END IF;
+END;
+$$;
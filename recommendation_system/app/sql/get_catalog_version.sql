@@ -0,0 +1,5 @@
+SELECT
+    md5(
+        (SELECT coalesce(string_agg(i::text, ',' ORDER BY i.id), '') FROM insurance_products i) || '|' ||
+        (SELECT coalesce(string_agg(c::text, ',' ORDER BY c.id), '') FROM insurance_categories c)
+    ) AS catalog_version;
@@ -7,7 +7,8 @@ SELECT
     i.duration_months as duration,
     c.name AS category_name,
     c.description AS category_description,
-    i.provider as provider
+    i.provider as provider,
+    GREATEST(i.updated_at, c.updated_at) AS updated_at
 FROM
     insurance_products i
 JOIN
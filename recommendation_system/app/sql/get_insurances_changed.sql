@@ -0,0 +1,21 @@
+SELECT
+    i.id as product_id,
+    i.name as product_name,
+    i.description,
+    i.premium,
+    i.coverage,
+    i.duration_months as duration,
+    c.name AS category_name,
+    c.description AS category_description,
+    i.provider as provider,
+    GREATEST(i.updated_at, c.updated_at) AS updated_at
+FROM
+    insurance_products i
+JOIN
+    insurance_categories c ON i.category_id = c.id
+WHERE
+    GREATEST(i.updated_at, c.updated_at) > %(since)s
+    OR i.id = ANY(%(product_ids)s)
+    OR c.id = ANY(%(category_ids)s)
+ORDER BY
+    i.id;
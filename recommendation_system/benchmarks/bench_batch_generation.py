@@ -0,0 +1,33 @@
+"""
+Пропускная способность генерации DialoGPT в зависимости от размера батча
+(требуются веса модели из MODEL_PATH).
+
+    python -m benchmarks.bench_batch_generation
+"""
+import os
+import time
+
+from app.models import ml_model
+from app.models.ml_model import InsuranceRecommenderModel
+
+MODEL_PATH = os.getenv("MODEL_PATH", "microsoft/DialoGPT-small")
+BATCH_SIZES = [1, 4, 8, 16, 32]
+PROMPTS_PER_RUN = 32
+
+
+def main():
+    model = InsuranceRecommenderModel(MODEL_PATH)
+    insurance = {'category_name': 'Медицинское страхование'}
+    prompts = (model._features_prompts(insurance) * PROMPTS_PER_RUN)[:PROMPTS_PER_RUN]
+
+    print(f"{'batch':>6} {'seconds':>9} {'prompts/s':>10}")
+    for batch_size in BATCH_SIZES:
+        ml_model.GENERATION_BATCH_SIZE = batch_size
+        started = time.perf_counter()
+        model._generate_texts(prompts, max_length=30)
+        elapsed = time.perf_counter() - started
+        print(f"{batch_size:>6} {elapsed:>9.2f} {len(prompts) / elapsed:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Пропускная способность (рекомендаций в секунду) при N параллельных запросах:
+каждый запрос сам вызывает generate против общего планировщика микробатчей.
+Генерация эмулируется: фиксированные накладные расходы на вызов плюс стоимость промпта,
+вызовы generate сериализуются, как на общем наборе ядер CPU.
+
+    python -m benchmarks.bench_batch_scheduler
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.models.content_store import ProductContentStore
+from app.services.batch_scheduler import GenerationBatchScheduler
+from benchmarks.common import USER, make_catalog, make_model
+
+CONCURRENCY = [1, 4, 16, 32]
+REQUESTS_PER_CLIENT = 3
+
+
+def run(concurrency: int, use_scheduler: bool) -> float:
+    model = make_model(make_catalog(200), generate_cost=0.02, prompt_cost=0.001)
+    model.content_store = ProductContentStore.load()
+    cores = threading.Lock()
+    fake_generate_batch = model._generate_batch
+
+    def generate_batch(prompts, max_length):
+        with cores:
+            return fake_generate_batch(prompts, max_length)
+
+    model._generate_batch = generate_batch
+    scheduler = None
+    if use_scheduler:
+        scheduler = GenerationBatchScheduler(model._generate_batch, max_batch_size=32, max_wait_ms=5)
+        model.batch_scheduler = scheduler
+
+    def client():
+        for _ in range(REQUESTS_PER_CLIENT):
+            model.get_recommendations(USER)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for future in [pool.submit(client) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    if scheduler is not None:
+        scheduler.shutdown()
+    return concurrency * REQUESTS_PER_CLIENT / elapsed
+
+
+def main():
+    print(f"{'clients':>8} {'direct, rps':>12} {'scheduler, rps':>15}")
+    for concurrency in CONCURRENCY:
+        print(f"{concurrency:>8} {run(concurrency, False):>12.1f} {run(concurrency, True):>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Память каталога и аллокации на запрос: список строк RealDictRow (как их отдаёт
+psycopg2) против колоночного CatalogSnapshot. Сами тексты общие в обоих случаях,
+сравниваются контейнеры: словари строк против колонок и записей со __slots__.
+Для запроса сравнивается пик аллокаций после скоринга: прежний список пар
+(оценка, строка) по всему каталогу с копиями dict(insurance) для выдачи против
+отбора по массивам позиций и оценок снимка.
+
+    python -m benchmarks.bench_catalog_memory
+"""
+import tracemalloc
+
+from psycopg2.extras import RealDictRow
+
+from app.models.catalog import CatalogSnapshot
+from benchmarks.common import USER, make_catalog, make_model
+
+CATALOG_SIZES = [1_000, 10_000, 100_000]
+TOP_N = 10
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current, peak
+
+
+def as_rows(catalog):
+    rows = []
+    for insurance in catalog:
+        row = RealDictRow()
+        row.update(insurance)
+        rows.append(row)
+    return rows
+
+
+def load_snapshot(catalog):
+    # Строки выборки после построения снимка больше не нужны, как в _load_data_from_database
+    return CatalogSnapshot(as_rows(catalog))
+
+
+def legacy_select(rows, positions, scores):
+    candidates = [(float(score), rows[position]) for position, score in zip(positions, scores)]
+    return [dict(insurance) for _, insurance in candidates[:TOP_N]]
+
+
+def columnar_select(model, positions, scores):
+    catalog = model._catalog
+    return [catalog.row(position) for _, position in model._select_diverse(catalog, positions, scores, TOP_N)]
+
+
+def main():
+    print(f"{'catalog':>8} {'rows, MB':>9} {'columns, MB':>12} {'ratio':>6} "
+          f"{'legacy peak, KB':>16} {'columnar peak, KB':>18}")
+    for size in CATALOG_SIZES:
+        rows, rows_bytes, _ = measure(as_rows, make_catalog(size))
+        snapshot, columns_bytes, _ = measure(load_snapshot, make_catalog(size))
+
+        model = make_model([])
+        model._catalog = snapshot
+        user_profile = model._format_user_profile(USER)
+        positions, scores = model._rank_candidates(user_profile)
+
+        # Первый вызов прогревочный: разовые аллокации интерпретатора не относятся к запросу
+        columnar_select(model, positions, scores)
+        _, _, legacy_peak = measure(legacy_select, rows, positions, scores)
+        _, _, columnar_peak = measure(columnar_select, model, positions, scores)
+
+        print(f"{size:>8} {rows_bytes / 2 ** 20:>9.2f} {columns_bytes / 2 ** 20:>12.2f} "
+              f"{rows_bytes / columns_bytes:>5.1f}x {legacy_peak / 1024:>16.0f} {columnar_peak / 1024:>18.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Задержка генерации, RSS процесса и расхождение текстов с fp32 для режимов
+MODEL_PRECISION (требуются веса модели из MODEL_PATH). Каждый режим загружается
+в отдельном процессе, чтобы RSS не смешивался; генерация жадная.
+
+    python -m benchmarks.bench_precision
+"""
+import difflib
+import multiprocessing
+import os
+import time
+
+MODEL_PATH = os.getenv("MODEL_PATH", "microsoft/DialoGPT-small")
+PRECISIONS = ['fp32', 'int8', 'bf16']
+PRODUCTS = 5
+REPEAT = 3
+
+
+def rss_mb() -> float:
+    with open('/proc/self/status', 'r') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(precision: str, results) -> None:
+    from app.models import ml_model
+    from app.models.ml_model import InsuranceRecommenderModel
+    from benchmarks.common import USER, make_catalog
+
+    ml_model.DETERMINISTIC_MODE = True
+    model = InsuranceRecommenderModel(MODEL_PATH, precision)
+
+    jobs = []
+    for insurance in make_catalog(PRODUCTS):
+        model._append_jobs(jobs, model._category_prompt_specs(insurance))
+        jobs.append((80, model._recommendation_reason_prompt(USER, insurance)))
+
+    best = float('inf')
+    texts = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        texts = model._run_prompt_jobs(jobs)
+        best = min(best, time.perf_counter() - started)
+
+    results[precision] = (model.precision, best, rss_mb(), texts)
+
+
+def main():
+    context = multiprocessing.get_context('spawn')
+    results = context.Manager().dict()
+    for precision in PRECISIONS:
+        process = context.Process(target=measure, args=(precision, results))
+        process.start()
+        process.join()
+
+    _, _, _, reference = results['fp32']
+    print(f"{'mode':>6} {'applied':>8} {'seconds':>8} {'RSS, MB':>8} {'same texts':>11} {'similarity':>11}")
+    for precision in PRECISIONS:
+        applied, seconds, rss, texts = results[precision]
+        same = sum(a == b for a, b in zip(texts, reference)) / len(reference)
+        similarity = sum(difflib.SequenceMatcher(None, a, b).ratio()
+                         for a, b in zip(texts, reference)) / len(reference)
+        print(f"{precision:>6} {applied:>8} {seconds:>8.2f} {rss:>8.0f} {same:>11.0%} {similarity:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
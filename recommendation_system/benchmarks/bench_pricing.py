@@ -0,0 +1,87 @@
+"""
+Расчёт estimated_price: прежний построчный _estimate_price (ветвления Python на
+каждую пару профиль × продукт) против PricingEngine, который считает матрицу
+профили × продукты одним broadcasting по колонке premium. Случайная надбавка
+берётся из одной и той же матрицы, поэтому цены должны совпасть.
+
+    python -m benchmarks.bench_pricing
+"""
+import random
+import time
+
+import numpy as np
+
+from app.models.catalog import CatalogSnapshot
+from app.models.pricing import PricingEngine
+from benchmarks.common import USER, make_catalog
+
+SHAPES = [(1, 10), (1, 10_000), (100, 1_000), (1_000, 10_000)]
+
+
+def legacy_price(user_data, insurance, unit):
+    base_price = float(insurance['premium'])
+
+    age_factor = 1.0
+    if user_data['age'] < 25:
+        age_factor = 1.3
+    elif user_data['age'] > 65:
+        age_factor = 1.4
+    elif user_data['age'] > 50:
+        age_factor = 1.2
+
+    income_factor = 1.0
+    if user_data['income'] > 2000000:
+        income_factor = 0.9
+    elif user_data['income'] > 1000000:
+        income_factor = 0.95
+
+    risk_factor = 1.0
+    if user_data['has_medical_conditions'] and insurance['category_name'] == 'Медицинское страхование':
+        risk_factor *= 1.3
+    if user_data['has_children']:
+        risk_factor *= 1.1
+
+    random_factor = 1.0 + (unit * 0.1 - 0.05)
+    estimated_price = base_price * age_factor * income_factor * risk_factor * random_factor
+
+    return min(base_price * 2.0, max(base_price * 0.7, estimated_price))
+
+
+def make_profiles(count):
+    rng = random.Random(0)
+    return [dict(USER, age=rng.randrange(18, 80), income=float(rng.randrange(300_000, 4_000_000)),
+                 has_children=rng.random() < 0.5, has_medical_conditions=rng.random() < 0.3)
+            for _ in range(count)]
+
+
+def main():
+    engine = PricingEngine(path=None)
+    print(f"{'profiles':>8} {'products':>8} {'scalar, ms':>11} {'vector, ms':>11} {'speedup':>8} {'equal':>6}")
+    for profile_count, catalog_size in SHAPES:
+        insurances = make_catalog(catalog_size)
+        # Одна категория под названием из тарифа, чтобы проверить медицинский коэффициент
+        for insurance in insurances[::7]:
+            insurance['category_name'] = 'Медицинское страхование'
+        catalog = CatalogSnapshot(insurances)
+        profiles = make_profiles(profile_count)
+        units = np.random.default_rng(0).random((profile_count, catalog_size))
+
+        # Построчный расчёт на 1000 × 10 000 идёт минуты: замеряется часть профилей
+        scalar_profiles = min(profile_count, max(1, 200_000 // catalog_size))
+        started = time.perf_counter()
+        expected = np.array([[legacy_price(profile, insurance, unit)
+                              for insurance, unit in zip(insurances, profile_units)]
+                             for profile, profile_units in zip(profiles[:scalar_profiles], units)])
+        scalar_time = (time.perf_counter() - started) * profile_count / scalar_profiles
+
+        started = time.perf_counter()
+        actual = engine.estimate(profiles, catalog.premium, catalog.category_ids, catalog.category_names, units)
+        vector_time = time.perf_counter() - started
+
+        equal = np.array_equal(expected, actual[:scalar_profiles])
+        print(f"{profile_count:>8} {catalog_size:>8} {scalar_time * 1000:>11.2f} {vector_time * 1000:>11.3f} "
+              f"{scalar_time / vector_time:>7.0f}x {str(equal):>6}")
+
+
+if __name__ == '__main__':
+    main()
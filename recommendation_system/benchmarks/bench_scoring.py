@@ -0,0 +1,58 @@
+"""
+Скоринг каталога: построчный legacy_similarity_score (как раньше, с форматированием
+каждого продукта на каждый запрос) против векторного ScoringIndex. Шум зафиксирован,
+чтобы сравнить ранжирование; время построения индекса выводится отдельно.
+
+    python -m benchmarks.bench_scoring
+"""
+import random
+import time
+
+import numpy as np
+
+from benchmarks.common import USER, legacy_similarity_score, make_catalog, make_model
+
+CATALOG_SIZES = [10, 1_000, 100_000]
+NOISE = 0.2
+
+
+def scalar_scores(model, user_profile):
+    return np.array([legacy_similarity_score(user_profile, model._format_insurance_info(insurance))
+                     for insurance in model.insurances])
+
+
+def main():
+    original_uniform = random.uniform
+    random.uniform = lambda a, b: NOISE
+    try:
+        print(f"{'catalog':>8} {'scalar, ms':>11} {'build, ms':>10} {'vector, ms':>11} {'speedup':>8} {'same order':>11}")
+        for size in CATALOG_SIZES:
+            model = make_model(make_catalog(size))
+            user_profile = model._format_user_profile(USER)
+
+            started = time.perf_counter()
+            expected = scalar_scores(model, user_profile)
+            scalar_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            index = model._get_scoring_index()
+            build_time = time.perf_counter() - started
+
+            noise = np.full(len(index), NOISE)
+            repeat = 20
+            started = time.perf_counter()
+            for _ in range(repeat):
+                actual = index.score(user_profile, noise)
+            vector_time = (time.perf_counter() - started) / repeat
+
+            same_order = (np.allclose(expected, actual)
+                          and np.array_equal(np.argsort(-expected, kind='stable'),
+                                             np.argsort(-actual, kind='stable')))
+            print(f"{size:>8} {scalar_time * 1000:>11.2f} {build_time * 1000:>10.2f} {vector_time * 1000:>11.3f} "
+                  f"{scalar_time / vector_time:>7.0f}x {str(same_order):>11}")
+    finally:
+        random.uniform = original_uniform
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Коалесцирование одновременных запросов: N клиентов отправляют профили из небольшого
+набора, вычисление рекомендаций выполняется в пуле инференса. Сравнивается число
+запусков модели и время без SingleFlight и с ним.
+
+    python -m benchmarks.bench_singleflight
+"""
+import asyncio
+import random
+import time
+
+from app.models.profile import profile_hash
+from app.services.inference_executor import InferenceExecutor
+from app.services.singleflight import SingleFlight
+from benchmarks.common import USER
+
+CLIENTS = 64
+DISTINCT_PROFILES = 8
+COMPUTE_SECONDS = 0.05
+
+
+def make_profiles():
+    rng = random.Random(0)
+    profiles = [dict(USER, has_children=bool(i & 1), has_vehicle=bool(i & 2), has_home=bool(i & 4))
+                for i in range(DISTINCT_PROFILES)]
+    return [rng.choice(profiles) for _ in range(CLIENTS)]
+
+
+async def run(use_singleflight: bool):
+    executor = InferenceExecutor(max_workers=4, max_queue=CLIENTS)
+    singleflight = SingleFlight()
+    calls = 0
+
+    def compute(user_data):
+        nonlocal calls
+        calls += 1
+        time.sleep(COMPUTE_SECONDS)
+        return user_data
+
+    async def request(user_data):
+        if not use_singleflight:
+            return await executor.run(compute, user_data)
+        return await singleflight.run(profile_hash(user_data), executor.run, compute, user_data)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request(profile) for profile in make_profiles()))
+    elapsed = time.perf_counter() - started
+    executor.shutdown()
+    return calls, elapsed, singleflight.stats()["coalescing_ratio"]
+
+
+def main():
+    print(f"{CLIENTS} concurrent requests, {DISTINCT_PROFILES} distinct profiles")
+    for name, enabled in (("direct", False), ("singleflight", True)):
+        calls, elapsed, ratio = asyncio.run(run(enabled))
+        print(f"{name:>13}: {calls:>3} model runs, {elapsed * 1000:7.1f} ms, coalescing ratio {ratio:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Число декодированных токенов на запрос рекомендаций без остановки на конце
+предложения и с ней (требуются веса модели из MODEL_PATH). Генерация жадная,
+поэтому тексты после _clean_generated_text должны совпасть.
+
+    python -m benchmarks.bench_stop_on_sentence
+"""
+import os
+import time
+
+from app.models import ml_model
+from app.models.ml_model import InsuranceRecommenderModel
+from benchmarks.common import USER, make_catalog
+
+MODEL_PATH = os.getenv("MODEL_PATH", "microsoft/DialoGPT-small")
+PRODUCTS_PER_REQUEST = 10
+
+
+def request_jobs(model):
+    jobs = []
+    for insurance in make_catalog(PRODUCTS_PER_REQUEST):
+        model._append_jobs(jobs, model._category_prompt_specs(insurance))
+        jobs.append((80, model._recommendation_reason_prompt(USER, insurance)))
+    return jobs
+
+
+def run(model, jobs, stop_on_sentence: bool):
+    ml_model.STOP_ON_SENTENCE = stop_on_sentence
+    model.decoded_tokens = 0
+    started = time.perf_counter()
+    texts = model._run_prompt_jobs(jobs)
+    return model.decoded_tokens, time.perf_counter() - started, texts
+
+
+def main():
+    ml_model.DETERMINISTIC_MODE = True
+    model = InsuranceRecommenderModel(MODEL_PATH)
+    jobs = request_jobs(model)
+
+    full_tokens, full_seconds, full_texts = run(model, jobs, False)
+    stop_tokens, stop_seconds, stop_texts = run(model, jobs, True)
+
+    print(f"{len(jobs)} prompts per request ({PRODUCTS_PER_REQUEST} products)")
+    print(f"{'mode':>18} {'decoded tokens':>15} {'seconds':>9}")
+    print(f"{'max_new_tokens':>18} {full_tokens:>15} {full_seconds:>9.2f}")
+    print(f"{'stop on sentence':>18} {stop_tokens:>15} {stop_seconds:>9.2f}")
+    print(f"tokens saved: {1 - stop_tokens / full_tokens:.0%}, same texts: {full_texts == stop_texts}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Сравнение задержки get_recommendations: прежний конвейер (генерация текста для
+каждого кандидата со score > 0.3) против двухфазного (ранжирование всего каталога,
+генерация только для top_n).
+
+Прежний конвейер воспроизведён здесь как был до изменений: построчный скоринг,
+13 отдельных вызовов генерации на каждого кандидата (причина, 4 особенности,
+3 целевые группы, 5 рисков) и построчный расчёт цены — без батчей, кэшей и
+хранилища контента, которые появились позже.
+
+    python -m benchmarks.bench_two_phase
+"""
+import random
+
+from benchmarks.bench_pricing import legacy_price
+from benchmarks.common import USER, legacy_similarity_score, make_catalog, make_model, timed
+
+CATALOG_SIZES = [10, 50, 200, 500]
+TOP_N = 10
+
+
+def legacy_generate_text(model, prompt, max_length):
+    # До батчинга каждый промпт шёл отдельным вызовом generate
+    return model._clean_generated_text(model._generate_batch([prompt], max_length)[0])
+
+
+def legacy_generate_items(model, prompts, max_length):
+    items = []
+    for prompt in prompts:
+        text = legacy_generate_text(model, prompt, max_length)
+        if text and len(text) > 5:
+            items.append(text)
+    return items
+
+
+def eager_pipeline(model, user_data, top_n):
+    user_profile = model._format_user_profile(user_data)
+    recommendations = []
+
+    for insurance in model.insurances:
+        match_score = legacy_similarity_score(user_profile, model._format_insurance_info(insurance))
+        if match_score > 0.3:
+            recommendation = dict(insurance)
+            recommendation['match_score'] = match_score
+            recommendation['estimated_price'] = legacy_price(user_data, insurance, random.random())
+            recommendation['recommendation_reason'] = legacy_generate_text(
+                model, model._recommendation_reason_prompt(user_data, insurance), 80)
+            recommendation['features'] = legacy_generate_items(model, model._features_prompts(insurance), 30)
+            recommendation['suitable_for'] = legacy_generate_items(model, model._suitable_for_prompts(insurance), 25)
+            recommendation['risks_covered'] = legacy_generate_items(model, model._risks_covered_prompts(insurance), 25)
+            recommendations.append(recommendation)
+
+    recommendations.sort(key=lambda r: r['match_score'], reverse=True)
+
+    final_recommendations = []
+    categories_added = set()
+    for recommendation in recommendations:
+        if recommendation['category_name'] not in categories_added and len(final_recommendations) < top_n:
+            final_recommendations.append(recommendation)
+            categories_added.add(recommendation['category_name'])
+
+    remaining = [r for r in recommendations if r not in final_recommendations]
+    final_recommendations.extend(remaining[:top_n - len(final_recommendations)])
+    return final_recommendations
+
+
+def main():
+    print(f"{'catalog':>8} {'eager, s':>10} {'prompts':>7} {'two-phase, s':>13} {'prompts':>7} {'speedup':>8}")
+    for size in CATALOG_SIZES:
+        model = make_model(make_catalog(size))
+
+        model.generated_prompts = 0
+        eager_time, _ = timed(eager_pipeline, model, USER, TOP_N, repeat=1)
+        eager_prompts = model.generated_prompts
+
+        model.generated_prompts = 0
+        two_phase_time, _ = timed(model.get_recommendations, USER, top_n=TOP_N, repeat=1)
+        two_phase_prompts = model.generated_prompts
+
+        print(f"{size:>8} {eager_time:>10.3f} {eager_prompts:>7} {two_phase_time:>13.3f} {two_phase_prompts:>7} "
+              f"{eager_time / two_phase_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Общие заготовки для бенчмарков: синтетический каталог, профиль пользователя
+и модель без загрузки весов DialoGPT (генерация текста эмулируется задержкой).
+
+Запуск из каталога recommendation_system:  python -m benchmarks.<имя_бенчмарка>
+"""
+import random
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from app.models.content_cache import CategoryContentCache
+from app.models.content_store import ProductContentStore
+from app.models.ml_model import InsuranceRecommenderModel
+from app.models.pricing import PricingEngine
+from app.models.scoring import category_bonus
+
+CATEGORIES = [
+    ('Life Insurance', 'Страхование жизни'),
+    ('Health Insurance', 'Медицинское страхование, здоровье'),
+    ('Auto Insurance', 'Авто и транспорт'),
+    ('Home Insurance', 'Недвижимость, дом'),
+    ('Travel Insurance', 'Страхование путешественников'),
+]
+
+PROVIDERS = ['Сбер Страхование', 'Альфа Страхование', 'Ингосстрах', 'РЕСО-Гарантия', 'Тинькофф Страхование']
+
+USER = {
+    'age': 34,
+    'gender': 'male',
+    'occupation': 'IT',
+    'income': 1500000.0,
+    'marital_status': 'married',
+    'has_children': True,
+    'has_vehicle': True,
+    'has_home': False,
+    'has_medical_conditions': False,
+    'travel_frequency': 'often',
+}
+
+
+def make_catalog(size: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    catalog = []
+    for product_id in range(1, size + 1):
+        category_name, category_description = CATEGORIES[product_id % len(CATEGORIES)]
+        catalog.append({
+            'product_id': product_id,
+            'product_name': f'Продукт {product_id}',
+            'description': f'{category_description}: программа №{product_id} с расширенным покрытием',
+            'premium': Decimal(rng.randrange(1000, 70000)),
+            'coverage': Decimal(rng.randrange(100000, 10000000)),
+            'duration': rng.choice([6, 12, 36, 60]),
+            'category_name': category_name,
+            'category_description': category_description,
+            'provider': rng.choice(PROVIDERS),
+        })
+    return catalog
+
+
+def legacy_similarity_score(user_profile: str, insurance_info: str, noise: Optional[float] = None) -> float:
+    """Прежний построчный скоринг продукта (до ScoringIndex): Жаккар по токенам + бонус категории + шум"""
+    user_tokens = set(user_profile.lower().split())
+    insurance_tokens = set(insurance_info.lower().split())
+
+    intersection = len(user_tokens.intersection(insurance_tokens))
+    union = len(user_tokens.union(insurance_tokens))
+
+    if union == 0:
+        return 0.3
+
+    base_score = intersection / union
+    if noise is None:
+        noise = random.uniform(0.1, 0.3)
+
+    final_score = min(0.95, base_score + category_bonus(insurance_info.lower()) + noise)
+    return max(0.3, final_score)
+
+
+def make_model(catalog: List[Dict[str, Any]], generate_cost: float = 0.002,
+               prompt_cost: float = 0.0005) -> InsuranceRecommenderModel:
+    """
+    Модель без весов: вызов generate стоит generate_cost секунд накладных расходов
+    плюс prompt_cost на каждый промпт в батче.
+    """
+    model = InsuranceRecommenderModel.__new__(InsuranceRecommenderModel)
+    model.insurances = catalog
+    model.catalog_version = 'benchmark'
+    model.precision = 'fp32'
+    model.batch_scheduler = None
+    model._catalog_refreshing = False
+    model._catalog_lock = threading.RLock()
+    model.embedding_index = None
+    model._embedding_catalog = None
+    model.content_cache = CategoryContentCache('benchmark')
+    model.content_store = ProductContentStore()
+    model.pricing = PricingEngine()
+    model.generate_calls = 0
+    model.generated_prompts = 0
+    model.decoded_tokens = 0
+    model._generation_stats_lock = threading.Lock()
+    model._sentence_end_ids = None
+
+    def fake_generate_batch(prompts: List[str], max_length: int) -> List[str]:
+        model.generate_calls += 1
+        model.generated_prompts += len(prompts)
+        time.sleep(generate_cost + prompt_cost * len(prompts))
+        return ['Сгенерированный текст для бенчмарка'] * len(prompts)
+
+    model._generate_batch = fake_generate_batch
+    return model
+
+
+def timed(func, *args, repeat: int = 3, **kwargs):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - started)
+    return best, result
@@ -1,5 +1,6 @@
+import asyncio
 from fastapi import FastAPI
-from app.api.endpoints import router as api_router
+from app.api.endpoints import router as api_router, recommendation_service
 
 app = FastAPI(
     title="Insurance Recommendation System",
@@ -9,6 +10,19 @@ app = FastAPI(
 app.include_router(api_router, prefix="/api")
 
 
+@app.on_event("startup")
+async def start_recommendation_service():
+    # Загрузка идёт в фоне, чтобы uvicorn сразу начал принимать соединения
+    # (готовность — GET /api/ready); в рабочих процессах serve.py модель уже загружена.
+    if not recommendation_service.ready:
+        app.state.startup_task = asyncio.create_task(recommendation_service.start())
+
+
+@app.on_event("shutdown")
+def shutdown_recommendation_service():
+    recommendation_service.shutdown()
+
+
 if __name__ == "__main__":
     import uvicorn
 
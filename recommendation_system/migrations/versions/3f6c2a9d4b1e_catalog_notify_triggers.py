@@ -0,0 +1,34 @@
+"""catalog_notify_triggers
+
+Revision ID: 3f6c2a9d4b1e
+Revises: 
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6c2a9d4b1e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TRIGGERS_SQL_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'app', 'sql', 'catalog_notify_triggers.sql')
+
+
+def upgrade():
+    # Триггеры LISTEN/NOTIFY для инкрементального обновления каталога (CatalogSubscriber)
+    with open(TRIGGERS_SQL_PATH, 'r') as sql_file:
+        op.execute(sql_file.read())
+
+
+def downgrade():
+    for table, suffix in [('insurance_products', 'notify'), ('insurance_categories', 'notify'),
+                          ('insurance_products', 'touch'), ('insurance_categories', 'touch')]:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_{suffix} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS notify_catalog_change()")
+    op.execute("DROP FUNCTION IF EXISTS touch_updated_at()")
@@ -0,0 +1,172 @@
+"""
+Многопроцессный запуск сервиса рекомендаций с общей копией весов модели.
+
+Родительский процесс открывает сокет, один раз проходит все этапы загрузки
+(RecommendationService.load: каталог, модель, индексы, прогрев) и делает fork ML_WORKERS рабочих
+процессов uvicorn. Веса тензоров не изменяются после загрузки, поэтому страницы
+памяти остаются общими (copy-on-write) и RAM не растёт в ML_WORKERS раз.
+Каждому рабочему процессу выделяется TORCH_THREADS_PER_WORKER потоков torch,
+по умолчанию — число ядер, делённое на число процессов.
+
+Пока родитель загружает модель, он сам отвечает на уже открытом сокете: GET /api/ready —
+503 с текущим этапом загрузки (как в однопроцессном режиме), остальные запросы — 503.
+
+    python serve.py
+"""
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+
+import torch
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8001"))
+ML_WORKERS = int(os.getenv("ML_WORKERS", "2"))
+TORCH_THREADS_PER_WORKER = int(os.getenv("TORCH_THREADS_PER_WORKER", "0")) or max(1, (os.cpu_count() or 1) // ML_WORKERS)
+
+
+def bind_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((HOST, PORT))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class LoadingResponder:
+    """Ответы 503 на сокете сервиса, пока родитель загружает модель; до fork поток останавливается"""
+
+    def __init__(self, sock: socket.socket, recommendation_service):
+        self.sock = sock
+        self.recommendation_service = recommendation_service
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="loading-responder", daemon=True)
+
+    def __enter__(self):
+        self.sock.settimeout(0.2)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        # Соединения, пришедшие после остановки, остаются в очереди сокета для рабочих процессов
+        self.sock.settimeout(None)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                conn, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            try:
+                self._respond(conn)
+            except OSError:
+                pass
+            finally:
+                conn.close()
+
+    def _respond(self, conn: socket.socket) -> None:
+        conn.settimeout(1.0)
+        head = b""
+        while b"\r\n\r\n" not in head and len(head) < 8192:
+            chunk = conn.recv(1024)
+            if not chunk:
+                break
+            head += chunk
+        path = head.split(b" ", 2)[1].split(b"?")[0] if head.count(b" ") >= 2 else b""
+
+        if path == b"/api/ready":
+            content = self.recommendation_service.startup.stats()
+        else:
+            content = {"detail": "Recommendation service is warming up"}
+        body = json.dumps(content).encode("utf-8")
+        conn.sendall(b"HTTP/1.1 503 Service Unavailable\r\n"
+                     b"content-type: application/json\r\n"
+                     b"content-length: " + str(len(body)).encode() + b"\r\n"
+                     b"connection: close\r\n\r\n" + body)
+
+
+def run_worker(sock: socket.socket, app, recommendation_service) -> None:
+    import uvicorn
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    torch.set_num_threads(TORCH_THREADS_PER_WORKER)
+    recommendation_service.after_fork()
+
+    server = uvicorn.Server(uvicorn.Config(app, host=HOST, port=PORT))
+    server.run(sockets=[sock])
+
+
+def spawn(sock: socket.socket, app, recommendation_service) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(sock, app, recommendation_service)
+        except BaseException as e:
+            print(f"Worker {os.getpid()} failed: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+    print(f"Started worker {pid} with {TORCH_THREADS_PER_WORKER} torch threads")
+    return pid
+
+
+def main():
+    # Родитель работает в один поток torch: пул OpenMP, созданный до fork,
+    # в дочерних процессах непригоден, а своим потокам родителю делать нечего.
+    torch.set_num_threads(1)
+
+    from main import app, recommendation_service
+
+    sock = bind_socket()
+    with LoadingResponder(sock, recommendation_service):
+        recommendation_service.load()
+    recommendation_service.prepare_fork()
+    # Объекты, созданные при загрузке, уходят из-под сборщика мусора: иначе его
+    # проходы в рабочих процессах копировали бы страницы с ними.
+    gc.collect()
+    gc.freeze()
+
+    workers = {spawn(sock, app, recommendation_service) for _ in range(ML_WORKERS)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}, restarting")
+            workers.add(spawn(sock, app, recommendation_service))
+
+    sock.close()
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
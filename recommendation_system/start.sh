@@ -3,20 +3,28 @@
 # Инициализация Alembic (если еще не инициализирован)
 python init_alembic.py
 
-# Создание начальной миграции (если нет миграций)
-if [ ! -d "migrations/versions" ] || [ -z "$(ls -A migrations/versions)" ]; then
+# Применение миграций (в репозитории уже есть миграция триггеров каталога)
+python apply_migrations.py
+
+# Создание начальной миграции моделей (если её нет): autogenerate требует базу в head,
+# поэтому она создаётся после применения существующих миграций и сразу применяется
+if ! ls migrations/versions/*_initial_migration.py > /dev/null 2>&1; then
     python create_initial_migration.py
+    python apply_migrations.py
 fi
 
-# Применение миграций
-python apply_migrations.py
-
 # Запуск отслеживания изменений в фоновом режиме
 python watch_changes.py &
 WATCH_PID=$!
 
-# Запуск основного приложения
-uvicorn main:app --host 0.0.0.0 --port 8001 --reload --reload-dir /app
+# Запуск основного приложения: ML_SERVER=prefork (по умолчанию) — несколько рабочих
+# процессов с общей копией модели (serve.py, без --reload); ML_SERVER=uvicorn — один
+# процесс uvicorn с перезагрузкой при изменении кода (для разработки)
+if [ "${ML_SERVER:-prefork}" = "prefork" ]; then
+    python serve.py
+else
+    uvicorn main:app --host 0.0.0.0 --port 8001 --reload --reload-dir /app
+fi
 
 # Завершение фонового процесса при выходе
 kill $WATCH_PID
\ No newline at end of file
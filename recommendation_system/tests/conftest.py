@@ -0,0 +1,44 @@
+import os
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def service_root(monkeypatch):
+    # SQL-файлы и конфигурация читаются по путям относительно каталога сервиса
+    monkeypatch.chdir(SERVICE_ROOT)
+
+
+@pytest.fixture
+def catalog_rows():
+    updated_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            'product_id': product_id,
+            'product_name': f'Продукт {product_id}',
+            'description': f'Описание продукта {product_id}',
+            'premium': Decimal(1000 * product_id),
+            'coverage': Decimal(100000 * product_id),
+            'duration': 12,
+            'category_name': category_name,
+            'category_description': f'{category_name}: описание',
+            'provider': 'Ингосстрах',
+            'updated_at': updated_at,
+        }
+        for product_id, category_name in [(1, 'Life Insurance'), (2, 'Health Insurance'), (3, 'Auto Insurance')]
+    ]
+
+
+@pytest.fixture
+def model(catalog_rows):
+    """Модель в режиме lazy: без загрузки весов и обращения к базе, каталог устанавливается как при загрузке"""
+    from app.models.catalog import CatalogSnapshot
+    from app.models.ml_model import InsuranceRecommenderModel
+
+    model = InsuranceRecommenderModel("microsoft/DialoGPT-small", lazy=True)
+    model._install_catalog(CatalogSnapshot(catalog_rows, 'v1', catalog_rows[0]['updated_at']))
+    return model
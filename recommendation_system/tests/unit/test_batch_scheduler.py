@@ -0,0 +1,93 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.batch_scheduler import GenerationBatchScheduler
+
+
+class TestGenerationBatchScheduler:
+    """Тесты объединения промптов в микробатчи"""
+
+    def test_concurrent_requests_share_batches(self):
+        """Промпты разных запросов уходят общими батчами, ответы возвращаются по своим местам"""
+        calls = []
+        lock = threading.Lock()
+
+        def generate_batch(prompts, max_length):
+            with lock:
+                calls.append((list(prompts), max_length))
+            return [f"{prompt}:{max_length}" for prompt in prompts]
+
+        scheduler = GenerationBatchScheduler(generate_batch, max_batch_size=64, max_wait_ms=50)
+        try:
+            requests = [[f"r{request}p{index}" for index in range(3)] for request in range(8)]
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(lambda prompts: scheduler.submit(prompts, 30), requests))
+        finally:
+            scheduler.shutdown()
+
+        assert results == [[f"{prompt}:30" for prompt in prompts] for prompts in requests]
+        assert len(calls) < len(requests)
+        assert sum(len(prompts) for prompts, _ in calls) == 24
+        assert scheduler.stats()["batched_prompts"] == 24
+
+    def test_batches_do_not_mix_generation_lengths(self):
+        """В одном батче только промпты с одинаковой длиной генерации"""
+        lengths = []
+
+        def generate_batch(prompts, max_length):
+            lengths.append(max_length)
+            return [str(max_length)] * len(prompts)
+
+        scheduler = GenerationBatchScheduler(generate_batch, max_batch_size=64, max_wait_ms=20)
+        try:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                short = pool.submit(scheduler.submit, ["a", "b"], 25)
+                long = pool.submit(scheduler.submit, ["c"], 80)
+                assert short.result() == ["25", "25"]
+                assert long.result() == ["80"]
+        finally:
+            scheduler.shutdown()
+
+        assert sorted(lengths) == [25, 80]
+
+    def test_batch_size_is_limited(self):
+        """Батч не превышает max_batch_size"""
+        sizes = []
+
+        def generate_batch(prompts, max_length):
+            sizes.append(len(prompts))
+            return list(prompts)
+
+        scheduler = GenerationBatchScheduler(generate_batch, max_batch_size=4, max_wait_ms=10)
+        try:
+            prompts = [str(index) for index in range(10)]
+            assert scheduler.submit(prompts, 30) == prompts
+        finally:
+            scheduler.shutdown()
+
+        assert sizes == [4, 4, 2]
+
+    def test_generation_error_is_raised_to_caller(self):
+        """Ошибка генерации передаётся запросу, планировщик продолжает работу"""
+        def generate_batch(prompts, max_length):
+            if "bad" in prompts:
+                raise RuntimeError("CUDA out of memory")
+            return list(prompts)
+
+        scheduler = GenerationBatchScheduler(generate_batch, max_batch_size=8, max_wait_ms=1)
+        try:
+            with pytest.raises(RuntimeError, match="out of memory"):
+                scheduler.submit(["bad"], 30)
+            assert scheduler.submit(["good"], 30) == ["good"]
+        finally:
+            scheduler.shutdown()
+
+    def test_submit_after_shutdown(self):
+        """После остановки новые промпты не принимаются"""
+        scheduler = GenerationBatchScheduler(lambda prompts, max_length: list(prompts))
+        scheduler.shutdown()
+        assert scheduler.submit([], 30) == []
+        with pytest.raises(RuntimeError):
+            scheduler.submit(["prompt"], 30)
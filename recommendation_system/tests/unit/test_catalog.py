@@ -0,0 +1,95 @@
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+
+def mock_connection(rows, catalog_version):
+    cursor = MagicMock()
+    cursor.fetchall.return_value = rows
+    cursor.fetchone.return_value = {'catalog_version': catalog_version}
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cursor
+    return conn, cursor
+
+
+class TestApplyCatalogChanges:
+    """Тесты инкрементального обновления каталога"""
+
+    @patch('app.models.ml_model.psycopg2.connect')
+    def test_updates_changed_and_added_products(self, mock_connect, model, catalog_rows):
+        """Изменённые строки заменяются, новые добавляются, остальные остаются"""
+        updated_at = catalog_rows[0]['updated_at'] + timedelta(minutes=5)
+        changed = dict(catalog_rows[1], premium=5000, updated_at=updated_at)
+        added = dict(catalog_rows[2], product_id=4, product_name='Продукт 4', updated_at=updated_at)
+        mock_connect.return_value, _ = mock_connection([changed, added], 'v2')
+
+        assert model.apply_catalog_changes({2}, set()) == 2
+
+        insurances = {insurance['product_id']: insurance for insurance in model.insurances}
+        assert sorted(insurances) == [1, 2, 3, 4]
+        assert insurances[2]['premium'] == 5000.0
+        assert insurances[4]['product_name'] == 'Продукт 4'
+        assert model.catalog_version == 'v2'
+        assert model._catalog.watermark == updated_at
+
+    @patch('app.models.ml_model.psycopg2.connect')
+    def test_removes_deleted_products(self, mock_connect, model):
+        """Продукт из уведомления, которого больше нет в базе, удаляется"""
+        mock_connect.return_value, _ = mock_connection([], 'v2')
+
+        assert model.apply_catalog_changes({3}, set()) == 1
+        assert [insurance['product_id'] for insurance in model.insurances] == [1, 2]
+
+    @patch('app.models.ml_model.psycopg2.connect')
+    def test_reads_since_watermark_with_overlap(self, mock_connect, model, catalog_rows):
+        """Запрос изменений начинается с отметки прошлой загрузки за вычетом перекрытия"""
+        mock_connect.return_value, cursor = mock_connection([], 'v2')
+
+        model.apply_catalog_changes({1}, {7})
+
+        params = cursor.execute.call_args_list[0][0][1]
+        assert params['since'] < catalog_rows[0]['updated_at']
+        assert params['product_ids'] == [1]
+        assert params['category_ids'] == [7]
+
+    @patch('app.models.ml_model.psycopg2.connect')
+    def test_same_version_keeps_snapshot(self, mock_connect, model):
+        """Если версия каталога не изменилась, снимок не пересобирается"""
+        snapshot = model._catalog
+        mock_connect.return_value, _ = mock_connection([], 'v1')
+
+        assert model.apply_catalog_changes({1}, set()) == 0
+        assert model._catalog is snapshot
+
+
+class TestRefreshCatalogIfChanged:
+    """Тесты проверки версии каталога"""
+
+    @patch('app.models.ml_model.psycopg2.connect')
+    def test_reload_error_keeps_current_snapshot(self, mock_connect, model):
+        """Ошибка перезагрузки не пробрасывается: запросы обслуживает прежний снимок"""
+        snapshot = model._catalog
+        version_conn, _ = mock_connection([], 'v2')
+        mock_connect.side_effect = [version_conn, ConnectionError("database is unavailable")]
+
+        assert model.refresh_catalog_if_changed() is False
+        assert model._catalog is snapshot
+
+    @patch('app.models.ml_model.psycopg2.connect')
+    def test_version_check_error(self, mock_connect, model):
+        """Недоступность базы при проверке версии не меняет каталог"""
+        snapshot = model._catalog
+        mock_connect.side_effect = ConnectionError("database is unavailable")
+
+        assert model.refresh_catalog_if_changed() is False
+        assert model._catalog is snapshot
+
+    @patch('app.models.ml_model.psycopg2.connect')
+    def test_reloads_changed_catalog(self, mock_connect, model, catalog_rows):
+        """Новая версия каталога загружается полностью"""
+        version_conn, _ = mock_connection([], 'v2')
+        load_conn, _ = mock_connection(catalog_rows[:1], 'v2')
+        mock_connect.side_effect = [version_conn, load_conn]
+
+        assert model.refresh_catalog_if_changed() is True
+        assert model.catalog_version == 'v2'
+        assert [insurance['product_id'] for insurance in model.insurances] == [1]
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+
+from app.models.embedding_index import EmbeddingIndex
+
+
+def encoder(texts):
+    # Детерминированные нормированные векторы по длине текста
+    vectors = np.array([[len(text), 1.0, float(len(text) % 3)] for text in texts], dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def products(*product_ids):
+    return [{'product_id': product_id, 'updated_at': 1.0} for product_id in product_ids]
+
+
+class TestEmbeddingIndex:
+    """Тесты индекса эмбеддингов продуктов"""
+
+    def test_top_k_checks_catalog_products(self):
+        """Позиции отдаются только для того набора продуктов, по которому построен индекс"""
+        index = EmbeddingIndex(encoder, path=None)
+        index.sync(products(1, 2, 3), ["a", "bbbb", "cc"])
+
+        assert sorted(index.top_k("bbb", 2, np.array([1, 2, 3])).tolist()) == [1, 2]
+        assert index.top_k("bbb", 2, np.array([1, 2, 4])) is None
+        assert index.top_k("bbb", 2, np.array([1, 2])) is None
+
+    def test_sync_reuses_unchanged_vectors(self):
+        """Вектор пересчитывается только для новых и изменённых продуктов"""
+        index = EmbeddingIndex(encoder, path=None)
+        index.sync(products(1, 2), ["a", "bb"])
+        index.sync(products(1, 2, 3), ["a", "bb", "ccc"])
+
+        assert index.encoded_total == 3
+        assert index.reused_total == 2
+        assert index.product_ids.tolist() == [1, 2, 3]
+
+    def test_save_and_load(self, tmp_path):
+        """Сохранение не оставляет временных файлов, индекс загружается с диска"""
+        index = EmbeddingIndex(encoder, path=str(tmp_path))
+        index.sync(products(1, 2), ["a", "bb"])
+
+        assert sorted(os.listdir(tmp_path)) == ["meta.npz", "vectors.npy"]
+        loaded = EmbeddingIndex(encoder, path=str(tmp_path))
+        assert loaded.product_ids.tolist() == [1, 2]
+        assert np.array_equal(loaded.vectors, index.vectors)
+        assert loaded.stats()["memory_mapped"]
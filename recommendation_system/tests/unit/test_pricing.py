@@ -0,0 +1,105 @@
+import json
+import os
+import random
+
+import numpy as np
+import pytest
+
+from app.models.catalog import CatalogSnapshot
+from app.models.pricing import FactorTable, PricingEngine
+
+
+def legacy_price(user_data, insurance, unit):
+    """Прежний построчный _estimate_price; unit — равномерное число в [0, 1) вместо random.random()"""
+    base_price = float(insurance['premium'])
+
+    age_factor = 1.0
+    if user_data['age'] < 25:
+        age_factor = 1.3
+    elif user_data['age'] > 65:
+        age_factor = 1.4
+    elif user_data['age'] > 50:
+        age_factor = 1.2
+
+    income_factor = 1.0
+    if user_data['income'] > 2000000:
+        income_factor = 0.9
+    elif user_data['income'] > 1000000:
+        income_factor = 0.95
+
+    risk_factor = 1.0
+    if user_data['has_medical_conditions'] and insurance['category_name'] == 'Медицинское страхование':
+        risk_factor *= 1.3
+    if user_data['has_children']:
+        risk_factor *= 1.1
+
+    random_factor = 1.0 + (unit * 0.1 - 0.05)
+    estimated_price = base_price * age_factor * income_factor * risk_factor * random_factor
+
+    return min(base_price * 2.0, max(base_price * 0.7, estimated_price))
+
+
+class TestFactorTable:
+    """Тесты диапазонов коэффициентов"""
+
+    def test_age_bands_follow_legacy_thresholds(self):
+        """Возраст: граница относится к следующему диапазону (< 25, <= 50, <= 65, > 65)"""
+        table = FactorTable([25, 51, 66], [1.3, 1.0, 1.2, 1.4], side='right')
+        assert [table.band(age) for age in [18, 24, 25, 50, 51, 65, 66, 90]] == [0, 0, 1, 1, 2, 2, 3, 3]
+        assert table.lookup(np.array([24, 25, 51, 66])).tolist() == [1.3, 1.0, 1.2, 1.4]
+
+    def test_income_bands_follow_legacy_thresholds(self):
+        """Доход: граница относится к текущему диапазону (> 1 000 000, > 2 000 000)"""
+        table = FactorTable([1000000, 2000000], [1.0, 0.95, 0.9], side='left')
+        incomes = [500000, 1000000, 1000001, 2000000, 2000001]
+        assert [table.band(income) for income in incomes] == [0, 0, 1, 1, 2]
+
+    def test_invalid_configuration(self):
+        """Число коэффициентов и порядок границ проверяются при загрузке"""
+        with pytest.raises(ValueError):
+            FactorTable([25, 50], [1.0, 1.1], side='right')
+        with pytest.raises(ValueError):
+            FactorTable([50, 25], [1.0, 1.1, 1.2], side='right')
+
+
+class TestPricingEngine:
+    """Тесты векторного расчёта estimated_price"""
+
+    def test_matches_legacy_formula(self, catalog_rows):
+        """Матрица профили × продукты совпадает с прежним построчным расчётом"""
+        rng = random.Random(0)
+        rows = [dict(catalog_rows[index % len(catalog_rows)], product_id=index + 1,
+                     category_name=rng.choice(['Медицинское страхование', 'Life Insurance']))
+                for index in range(60)]
+        catalog = CatalogSnapshot(rows)
+        profiles = [{'age': age, 'income': float(income), 'has_children': children, 'has_medical_conditions': medical}
+                    for age in [18, 25, 50, 51, 65, 66]
+                    for income in [1000000, 1000001, 2000000, 2000001]
+                    for children in [False, True]
+                    for medical in [False, True]]
+        units = np.random.default_rng(0).random((len(profiles), len(rows)))
+
+        actual = PricingEngine(path=None).estimate(profiles, catalog.premium, catalog.category_ids,
+                                                   catalog.category_names, units)
+        expected = np.array([[legacy_price(profile, insurance, unit) for insurance, unit in zip(rows, profile_units)]
+                             for profile, profile_units in zip(profiles, units)])
+        assert np.array_equal(actual, expected)
+
+    def test_reload_keeps_previous_tables_on_invalid_file(self, tmp_path):
+        """Ошибка в файле тарифов не меняет действующую версию"""
+        path = tmp_path / "pricing_factors.json"
+        path.write_text(json.dumps({"age": {"bands": [30], "factors": [1.0, 2.0]},
+                                    "income": {"bands": [], "factors": [1.0]}, "clamp": [0.5, 3.0]}))
+        engine = PricingEngine(path=str(path), reload_interval=0)
+        version = engine.version
+
+        path.write_text("{not json")
+        os.utime(path, (0, 1))
+        assert engine.version == version
+        assert engine.reload_errors == 1
+
+        path.write_text(json.dumps({"age": {"bands": [30], "factors": [1.0, 3.0]},
+                                    "income": {"bands": [], "factors": [1.0]}, "clamp": [0.5, 3.0]}))
+        os.utime(path, (0, 2))
+        assert engine.version != version
+        assert engine.tables().age.lookup(np.array([40])).tolist() == [3.0]
@@ -0,0 +1,94 @@
+from unittest.mock import MagicMock, patch
+
+from app.services.response_cache import ResponseCache
+
+RESPONSE = [{"product_id": 1, "product_name": "Продукт 1", "match_score": 0.8}]
+
+
+class TestResponseCache:
+    """Тесты кэша готовых ответов"""
+
+    def test_put_and_get(self):
+        """Ответ возвращается в том же виде, в каком был сохранён"""
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        key = ResponseCache.key("v1", "profile")
+        assert cache.get(key) is None
+        cache.put(key, RESPONSE)
+        assert cache.get(key) == RESPONSE
+        assert cache.stats()["local_hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    @patch('app.services.response_cache.time.monotonic')
+    def test_entry_expires_after_ttl(self, mock_monotonic):
+        """Запись старше TTL не отдаётся и удаляется"""
+        mock_monotonic.return_value = 100.0
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        key = ResponseCache.key("v1", "profile")
+        cache.put(key, RESPONSE)
+
+        mock_monotonic.return_value = 160.0
+        assert cache.get(key) == RESPONSE
+
+        mock_monotonic.return_value = 160.5
+        assert cache.get(key) is None
+        assert cache.stats()["size"] == 0
+        assert cache.memory_bytes == 0
+
+    def test_catalog_version_change_drops_stale_entries(self):
+        """Новая версия каталога удаляет ответы по прежним версиям"""
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        cache.set_catalog_version("v1")
+        cache.put(ResponseCache.key("v1", "a"), RESPONSE)
+        cache.put(ResponseCache.key("v1", "b"), RESPONSE)
+
+        cache.set_catalog_version("v2")
+        cache.put(ResponseCache.key("v2", "a"), RESPONSE)
+        assert cache.get(ResponseCache.key("v1", "a")) is None
+        assert cache.get(ResponseCache.key("v2", "a")) == RESPONSE
+        assert cache.stats()["size"] == 1
+        assert cache.stats()["invalidations"] == 1
+
+        # Повторная установка той же версии ничего не удаляет
+        cache.set_catalog_version("v2")
+        assert cache.stats()["size"] == 1
+        assert cache.stats()["invalidations"] == 1
+
+    def test_lru_eviction_keeps_memory_accounting(self):
+        """При переполнении вытесняется давно не использованная запись"""
+        cache = ResponseCache(max_entries=2, ttl_seconds=60)
+        cache.put("v1:a", RESPONSE)
+        cache.put("v1:b", RESPONSE)
+        cache.get("v1:a")
+        cache.put("v1:c", RESPONSE)
+
+        assert cache.get("v1:b") is None
+        assert cache.get("v1:a") == RESPONSE
+        assert cache.stats()["evictions"] == 1
+        assert cache.memory_bytes == 2 * len(cache._entries["v1:a"][1])
+
+    def test_shared_tier_fills_local_tier(self):
+        """Промах в процессе читается из общего уровня и сохраняется локально"""
+        shared = MagicMock()
+        writer = ResponseCache(max_entries=10, ttl_seconds=60, shared=shared)
+        writer.put("v1:a", RESPONSE)
+        payload = shared.set.call_args[0][1]
+
+        shared.get.return_value = payload
+        reader = ResponseCache(max_entries=10, ttl_seconds=60, shared=shared)
+        assert reader.get("v1:a") == RESPONSE
+        assert reader.get("v1:a") == RESPONSE
+        assert shared.get.call_count == 1
+        assert reader.stats()["shared_hits"] == 1
+        assert reader.stats()["local_hits"] == 1
+
+    def test_shared_tier_errors_are_not_raised(self):
+        """Недоступность общего уровня считается промахом"""
+        shared = MagicMock()
+        shared.get.side_effect = ConnectionError("redis is down")
+        shared.set.side_effect = ConnectionError("redis is down")
+        cache = ResponseCache(max_entries=10, ttl_seconds=60, shared=shared)
+
+        assert cache.get("v1:a") is None
+        cache.put("v1:a", RESPONSE)
+        assert cache.get("v1:a") == RESPONSE
+        assert cache.stats()["shared_errors"] == 2
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from app.models.selection import select_top_k
+
+
+def legacy_select(scores, categories, top_n):
+    """Прежний _select_diverse: полная сортировка, затем лучший продукт каждой категории и остаток по оценке"""
+    order = np.argsort(-scores, kind='stable')
+    selected = []
+    selected_ranks = set()
+    categories_added = set()
+
+    for rank, category in enumerate(categories[order].tolist()):
+        if len(selected) >= top_n:
+            break
+        if category not in categories_added:
+            selected.append(int(order[rank]))
+            selected_ranks.add(rank)
+            categories_added.add(category)
+
+    for rank in range(len(order)):
+        if len(selected) >= top_n:
+            break
+        if rank not in selected_ranks:
+            selected.append(int(order[rank]))
+
+    return selected
+
+
+def brute_force_mmr(scores, categories, top_n, category_cap=None, diversity=1.0):
+    """Эталон: на каждом шаге перебираются все оставшиеся кандидаты"""
+    order = sorted(range(len(scores)), key=lambda index: (-scores[index], index))
+    picks = []
+    counts = {}
+    while len(picks) < top_n:
+        best, best_value = None, None
+        for index in order:
+            category = categories[index]
+            if index in picks or (category_cap is not None and counts.get(category, 0) >= category_cap):
+                continue
+            value = (1.0 - diversity) * scores[index] - diversity * (counts.get(category, 0) > 0)
+            if best is None or value > best_value:
+                best, best_value = index, value
+        if best is None:
+            break
+        picks.append(best)
+        counts[categories[best]] = counts.get(categories[best], 0) + 1
+    return picks
+
+
+class TestSelectTopK:
+    """Тесты отбора top_n с разнообразием категорий"""
+
+    @pytest.mark.parametrize("diversity", [0.0, 0.3, 0.7, 1.0])
+    @pytest.mark.parametrize("category_cap", [None, 1, 2])
+    def test_matches_brute_force_mmr(self, diversity, category_cap):
+        """Совпадение с полным перебором на случайных оценках с повторами"""
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            size = int(rng.integers(1, 200))
+            scores = np.round(rng.uniform(0.3, 0.95, size), 2)
+            categories = rng.integers(0, int(rng.integers(1, 12)), size)
+            top_n = int(rng.integers(1, 15))
+
+            actual = select_top_k(scores, categories, top_n, category_cap, diversity).tolist()
+            expected = brute_force_mmr(scores.tolist(), categories.tolist(), top_n, category_cap, diversity)
+            assert actual == expected
+
+    def test_full_diversity_matches_legacy_selection(self):
+        """diversity=1.0 без ограничения категории повторяет прежний _select_diverse"""
+        rng = np.random.default_rng(1)
+        scores = np.clip(np.round(rng.normal(0.55, 0.2, 5000), 3), 0.3, 0.95)
+        for category_count in [1, 5, 100, 5000]:
+            categories = rng.integers(0, category_count, len(scores))
+            assert select_top_k(scores, categories, 10).tolist() == legacy_select(scores, categories, 10)
+
+    def test_category_cap_limits_products_per_category(self):
+        """category_cap ограничивает выдачу даже если мест остаётся больше"""
+        scores = np.array([0.9, 0.8, 0.7, 0.6, 0.5])
+        categories = np.array([0, 0, 0, 1, 1])
+        assert select_top_k(scores, categories, 5, category_cap=1).tolist() == [0, 3]
+
+    def test_empty_input(self):
+        """Пустой список кандидатов и top_n=0"""
+        assert select_top_k(np.array([]), np.array([], dtype=np.int64), 5).tolist() == []
+        assert select_top_k(np.array([0.5]), np.array([0]), 0).tolist() == []
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from app.services.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Тесты объединения одновременных запросов"""
+
+    def test_concurrent_calls_with_same_key_run_once(self):
+        """Одновременные вызовы с одним ключом получают один результат"""
+        singleflight = SingleFlight()
+        calls = []
+
+        async def compute(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return value * 2
+
+        async def scenario():
+            return await asyncio.gather(*(singleflight.run("key", compute, 21) for _ in range(5)))
+
+        assert asyncio.run(scenario()) == [42] * 5
+        assert calls == [21]
+        assert singleflight.stats()["executed"] == 1
+        assert singleflight.stats()["coalesced"] == 4
+        assert singleflight.stats()["in_flight"] == 0
+
+    def test_different_keys_run_separately(self):
+        """Разные ключи вычисляются независимо"""
+        singleflight = SingleFlight()
+
+        async def compute(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        async def scenario():
+            return await asyncio.gather(singleflight.run("a", compute, 1), singleflight.run("b", compute, 2))
+
+        assert asyncio.run(scenario()) == [1, 2]
+        assert singleflight.stats()["executed"] == 2
+
+    def test_sequential_calls_are_not_coalesced(self):
+        """Завершённое вычисление не переиспользуется: это задача кэша ответов"""
+        singleflight = SingleFlight()
+
+        async def compute():
+            return object()
+
+        async def scenario():
+            return await singleflight.run("key", compute), await singleflight.run("key", compute)
+
+        first, second = asyncio.run(scenario())
+        assert first is not second
+        assert singleflight.stats()["executed"] == 2
+
+    def test_exception_is_shared_by_waiters(self):
+        """Исключение вычисления получают все ожидающие"""
+        singleflight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise ValueError("generation failed")
+
+        async def scenario():
+            return await asyncio.gather(*(singleflight.run("key", compute) for _ in range(3)),
+                                        return_exceptions=True)
+
+        results = asyncio.run(scenario())
+        assert all(isinstance(result, ValueError) for result in results)
+        assert singleflight.stats()["executed"] == 1
+
+    def test_cancelled_waiter_does_not_cancel_computation(self):
+        """Отмена одного запроса не прерывает вычисление для остальных"""
+        singleflight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def scenario():
+            first = asyncio.ensure_future(singleflight.run("key", compute))
+            second = asyncio.ensure_future(singleflight.run("key", compute))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+        assert asyncio.run(scenario()) == "done"